@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+# Solo NumPy: este módulo es lo único que necesita el server para predecir con un
+# artefacto exportado por EnsembleModel.export_compiled (sin sklearn ni lightgbm).
+#
+# Dos layouts con las mismas claves (se cargan con allow_pickle=False):
+#   - directorio: meta.json + un <clave>.npy por arreglo. np.load(mmap_mode="r") mapea los
+#     arreglos, así que varios workers comparten las mismas páginas del page cache.
+#     <path> es un symlink a .<nombre>.<export_id>/; cada export escribe un directorio nuevo
+#     y cambia el symlink, nunca reescribe .npy que otro proceso tenga mapeados.
+#   - archivo .npz: todo en un archivo, se lee a memoria en cada proceso.
+#
+#   meta                      JSON: num_cols, cat_cols, learners [{name, kind}], weights, trained_on_log,
+#                             export_id (hash del contenido, la versión del artefacto en el server)
+#   num_median                medianas del SimpleImputer numérico
+#   yj_lambda                 lambdas Yeo-Johnson del PowerTransformer
+#   scaler_mean, scaler_scale estandarización del PowerTransformer
+#   cat_fill                  moda del SimpleImputer categórico
+#   cat_vocab, cat_offsets    categorías del OneHotEncoder concatenadas (ordenadas por columna)
+#   <name>.coef, <name>.intercept   modelos lineales
+#   <name>.<TreeEnsemble.ARRAYS>    árboles listos para evaluar (ver TreeEnsemble)
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_ZERO_THRESHOLD = 1e-35  # kZeroThreshold de LightGBM
+
+
+def yeo_johnson(x, lmbda):
+    # Misma fórmula que scipy.stats.yeojohnson (la usa PowerTransformer.transform)
+    eps = np.finfo(np.float64).eps
+    out = np.zeros_like(x)
+    pos = x >= 0
+    if abs(lmbda) < eps:
+        out[pos] = np.log1p(x[pos])
+    else:
+        out[pos] = np.expm1(lmbda * np.log1p(x[pos])) / lmbda
+    if abs(lmbda - 2) > eps:
+        out[~pos] = -np.expm1((2 - lmbda) * np.log1p(-x[~pos])) / (2 - lmbda)
+    else:
+        out[~pos] = -np.log1p(-x[~pos])
+    return out
+
+
+def transform_features(arrays, num_cols, cat_cols, X):
+    """Replica el ColumnTransformer de build_preprocessor con los arreglos de _compile_preprocessor."""
+    a = arrays
+    n = len(X[num_cols[0]] if num_cols else X[cat_cols[0]])
+    Xt = np.zeros((n, len(num_cols) + int(a["cat_offsets"][-1])))
+
+    for j, col in enumerate(num_cols):
+        x = np.array(X[col], dtype=np.float64)
+        x[np.isnan(x)] = a["num_median"][j]
+        Xt[:, j] = yeo_johnson(x, a["yj_lambda"][j])
+    k = len(num_cols)
+    Xt[:, :k] = (Xt[:, :k] - a["scaler_mean"]) / a["scaler_scale"]
+
+    rows = np.arange(n)
+    offsets = a["cat_offsets"]
+    for j, col in enumerate(cat_cols):
+        v = np.asarray(X[col], dtype=object)
+        v = np.where(v != v, a["cat_fill"][j], v).astype(str)  # v != v: NaN
+        vocab = a["cat_vocab"][offsets[j]:offsets[j + 1]]
+        pos = np.minimum(np.searchsorted(vocab, v), len(vocab) - 1)
+        hit = vocab[pos] == v  # categorías no vistas quedan en cero (handle_unknown="ignore")
+        Xt[rows[hit], k + offsets[j] + pos[hit]] = 1.0
+    return Xt
+
+
+def artifact_id(arrays, meta):
+    """Hash de los arreglos y de meta: mismo contenido, mismo id."""
+    h = hashlib.sha256(json.dumps(meta, sort_keys=True).encode())
+    for name in sorted(arrays):
+        arr = np.ascontiguousarray(arrays[name])
+        h.update(f"{name}:{arr.dtype.str}:{arr.shape};".encode())
+        h.update(arr)
+    return h.hexdigest()[:16]
+
+
+def save_artifact(path, arrays, meta, keep=2):
+    """
+    Escribe el artefacto: un .npz si path termina en .npz, si no un directorio mapeable.
+
+    Nada se escribe en su lugar final: el .npz va a un temporal que se renombra
+    sobre path, y el directorio se arma en .<nombre>.tmp-* y pasa a ser la versión
+    .<nombre>.<export_id> a la que apunta el symlink path (cambiado con os.replace).
+    Los lectores ven el artefacto anterior o el nuevo completo. Quedan las keep
+    versiones anteriores; borrar una que otro proceso tiene mapeada no le cambia
+    nada (el inode vive hasta que se desmapea).
+    """
+    meta = dict(meta, export_id=artifact_id(arrays, meta))
+    path = os.path.normpath(path)
+    parent, name = os.path.split(path)
+    parent = parent or "."
+    os.makedirs(parent, exist_ok=True)
+
+    if path.endswith(".npz"):
+        fd, tmp = tempfile.mkstemp(dir=parent, prefix=f".{name}.tmp-")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+        return path
+
+    tmp = tempfile.mkdtemp(dir=parent, prefix=f".{name}.tmp-")
+    for key, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+    with open(os.path.join(tmp, "meta.json"), "w") as fh:
+        json.dump(meta, fh)
+    version = f".{name}.{meta['export_id']}"
+    if os.path.isdir(os.path.join(parent, version)):
+        shutil.rmtree(tmp)  # mismo contenido ya exportado
+    else:
+        os.rename(tmp, os.path.join(parent, version))
+
+    if os.path.isdir(path) and not os.path.islink(path):
+        # Directorio de un export sin symlink: se aparta como una versión más
+        os.rename(path, os.path.join(parent, f".{name}.{time.time_ns()}"))
+    link = os.path.join(parent, f".{name}.tmp-link")
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(version, link)
+    os.replace(link, path)
+
+    old = [
+        os.path.join(parent, d) for d in os.listdir(parent)
+        if d.startswith(f".{name}.") and not d.startswith(f".{name}.tmp-") and d != version
+        and os.path.isdir(os.path.join(parent, d))
+    ]
+    for d in sorted(old, key=os.path.getmtime)[:-keep or None]:
+        shutil.rmtree(d, ignore_errors=True)
+    return path
+
+
+def load_artifact(path, mmap_mode="r"):
+    """(arrays, meta) de un artefacto; en un directorio los arreglos quedan mapeados con mmap_mode."""
+    # Se resuelve el symlink una vez: meta y arreglos salen de la misma versión aunque se re-exporte
+    path = os.path.realpath(path)
+    if os.path.isdir(path):
+        with open(os.path.join(path, "meta.json")) as fh:
+            meta = json.load(fh)
+        arrays = {
+            f[:-len(".npy")]: np.load(os.path.join(path, f), mmap_mode=mmap_mode, allow_pickle=False)
+            for f in os.listdir(path) if f.endswith(".npy")
+        }
+        return arrays, meta
+
+    with np.load(path, allow_pickle=False) as z:
+        arrays = {k: z[k] for k in z.files}
+    return arrays, json.loads(str(arrays.pop("meta")))
+
+
+def artifact_version(path):
+    """export_id del artefacto en path, leyendo sólo meta (sin cargar los arreglos)."""
+    path = os.path.realpath(path)
+    if os.path.isdir(path):
+        with open(os.path.join(path, "meta.json")) as fh:
+            return json.load(fh)["export_id"]
+    with np.load(path, allow_pickle=False) as z:
+        return json.loads(str(z["meta"]))["export_id"]
+
+
+class TreeEnsemble:
+    """
+    Bosque de árboles de decisión en arreglos planos de nodos.
+
+    Cada celda (fila, árbol) guarda su nodo actual; en cada paso todas las
+    celdas que no llegaron a una hoja bajan un nivel con las mismas operaciones
+    vectorizadas, y las que llegan salen del conjunto activo. Las hojas se
+    suman en el orden de los árboles, igual que LightGBM.
+    """
+
+    ARRAYS = ("feature", "threshold", "children", "default_left", "missing_type", "is_leaf", "value", "roots")
+
+    def __init__(self, arrays):
+        # Usa los arreglos tal cual (sin copiar), así un artefacto mapeado sigue compartido
+        for k in self.ARRAYS:
+            setattr(self, k, arrays[k])
+        self.zero_as_missing = bool(np.any(self.missing_type == MISSING_ZERO))
+
+    @classmethod
+    def from_dump(cls, t):
+        """
+        Construye los arreglos a partir de los árboles aplanados de ensemble._compile_lgbm
+        (feature, threshold, left, right, default_left, missing_type, leaf_value, roots;
+        hijo >= 0 es nodo interno, < 0 es la hoja ~hijo). Sólo se usa al exportar.
+        """
+        n_int, n_leaf = len(t["feature"]), len(t["leaf_value"])
+        leaves = np.arange(n_int, n_int + n_leaf, dtype=np.int64)
+
+        def node_id(child):
+            child = np.asarray(child, dtype=np.int64)
+            return np.where(child >= 0, child, n_int + ~child)
+
+        # Nodos internos [0, n_int), hojas [n_int, n_int + n_leaf); las hojas apuntan a sí mismas.
+        # children[2 * nodo + 1] es el hijo derecho: el siguiente nodo es children[2 * nodo + va_a_la_derecha]
+        return cls({
+            "feature": np.concatenate([t["feature"], np.zeros(n_leaf, dtype=t["feature"].dtype)]).astype(np.int64),
+            "threshold": np.concatenate([t["threshold"], np.zeros(n_leaf)]),
+            "children": np.column_stack([
+                np.concatenate([node_id(t["left"]), leaves]),
+                np.concatenate([node_id(t["right"]), leaves]),
+            ]).ravel(),
+            "default_left": np.concatenate([t["default_left"], np.zeros(n_leaf, dtype=bool)]),
+            "missing_type": np.concatenate([t["missing_type"], np.zeros(n_leaf, dtype=np.int8)]),
+            "is_leaf": np.concatenate([np.zeros(n_int, dtype=bool), np.ones(n_leaf, dtype=bool)]),
+            "value": np.concatenate([np.zeros(n_int), t["leaf_value"]]),
+            "roots": node_id(t["roots"]),
+        })
+
+    def arrays(self):
+        return {k: getattr(self, k) for k in self.ARRAYS}
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _go_right(self, fval, nd):
+        # Regla de NumericalDecision de LightGBM con valores faltantes
+        mt = self.missing_type[nd]
+        nan = np.isnan(fval)
+        fval = np.where(nan & (mt != MISSING_NAN), 0.0, fval)
+        missing = ((mt == MISSING_ZERO) & (np.abs(fval) <= _ZERO_THRESHOLD)) | ((mt == MISSING_NAN) & nan)
+        return np.where(missing, ~self.default_left[nd], ~(fval <= self.threshold[nd]))
+
+    def _leaves(self, Xt, roots):
+        """Índice de hoja de cada (fila, árbol), shape (n, len(roots))."""
+        n, n_feat = Xt.shape
+        flat = Xt.ravel()
+        node = np.tile(roots, n)
+        base = np.repeat(np.arange(n, dtype=np.int64) * n_feat, len(roots))
+        check_missing = self.zero_as_missing or np.isnan(flat).any()
+
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            nd = node[active]
+            fval = flat[base[active] + self.feature[nd]]
+            if check_missing:
+                right = self._go_right(fval, nd)
+            else:
+                right = fval > self.threshold[nd]
+            nd = self.children[2 * nd + right]
+            node[active] = nd
+            active = active[~self.is_leaf[nd]]
+        return node.reshape(n, len(roots))
+
+    def predict(self, Xt, max_cells=1 << 20):
+        """Suma de las hojas por fila. Los árboles se procesan en bloques de ~max_cells (fila, árbol)."""
+        Xt = np.ascontiguousarray(Xt, dtype=np.float64)
+        n = Xt.shape[0]
+        out = np.zeros(n)
+        step = max(1, max_cells // max(n, 1))
+        for start in range(0, self.n_trees, step):
+            vals = self.value[self._leaves(Xt, self.roots[start:start + step])]
+            # cumsum suma en orden secuencial (np.sum usa suma por pares y cambiaría los últimos bits)
+            out = np.cumsum(np.column_stack([out, vals]), axis=1)[:, -1]
+        return out
+
+
+class CompiledEnsemble:
+    """
+    Predictor del ensamble en NumPy puro.
+
+    predict(X) devuelve la combinación ponderada en la escala de entrenamiento
+    (log1p si trained_on_log), igual que el modelo en MLflow; predict_full(X)
+    replica EnsembleModel.predict_full. X es el DataFrame de make_features (o
+    cualquier mapping columna -> array).
+    """
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.num_cols = meta["num_cols"]
+        self.cat_cols = meta["cat_cols"]
+        self.learners = meta["learners"]
+        self.weights = meta["weights"]
+        self.trained_on_log = meta["trained_on_log"]
+        self.arrays = arrays
+        self.n_features = len(self.num_cols) + int(arrays["cat_offsets"][-1])
+        self._trees = {}
+        for l in self.learners:
+            if l["kind"] != "trees":
+                continue
+            name = l["name"]
+            if f"{name}.children" not in arrays:
+                raise ValueError(f"El artefacto no tiene los árboles de {name!r} ({name}.children): re-exportar")
+            self._trees[name] = TreeEnsemble({k: arrays[f"{name}.{k}"] for k in TreeEnsemble.ARRAYS})
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        arrays, meta = load_artifact(path, mmap_mode=mmap_mode)
+        return cls(arrays, meta)
+
+    def transform(self, X):
+        return transform_features(self.arrays, self.num_cols, self.cat_cols, X)
+
+    def predict_matrix(self, X):
+        Xt = self.transform(X)
+        cols = []
+        for l in self.learners:
+            if l["kind"] == "linear":
+                cols.append(Xt @ self.arrays[f"{l['name']}.coef"] + self.arrays[f"{l['name']}.intercept"][0])
+            else:
+                cols.append(self._trees[l["name"]].predict(Xt))
+        return np.column_stack(cols)
+
+    def predict(self, X):
+        w = np.array([self.weights[l["name"]] for l in self.learners])
+        return self.predict_matrix(X) @ w
+
+    def predict_full(self, X, trained_on_log=None):
+        trained_on_log = self.trained_on_log if trained_on_log is None else trained_on_log
+        pred = self.predict(X)
+        return np.expm1(pred) if trained_on_log else pred
@@ -3,71 +3,413 @@ import sys
 sys.path.append("../../../")
 from utils.utils_yose import build_preprocessor
 
+import hashlib
+import inspect
+import os
+from contextlib import nullcontext
+from importlib import import_module
+from itertools import combinations
+
 import numpy as np
+import scipy.sparse as sp
+from joblib import Memory, Parallel, delayed
+from threadpoolctl import threadpool_limits
 
+from scipy.optimize import nnls
+import sklearn
 from sklearn.metrics import r2_score, root_mean_squared_error
 from sklearn.model_selection import KFold
 from sklearn.pipeline import Pipeline
 from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.linear_model import ElasticNet
 
+import lightgbm as lgb
 from lightgbm import LGBMRegressor as LGBM
 
+try:
+    from compiled import TreeEnsemble, save_artifact
+except ImportError:
+    from .compiled import TreeEnsemble, save_artifact
+
 
 from warnings import filterwarnings
 
 filterwarnings("ignore")
 
+
+# Registro de modelos base: nombre -> (estimador o "modulo.Clase", params por defecto).
+# Los que dependen de paquetes opcionales (xgboost, catboost) se importan al usarse.
+BASE_LEARNERS = {}
+DEFAULT_LEARNERS = ("elasticnet", "lgbm")
+
+
+def register_learner(name, estimator, **defaults):
+    BASE_LEARNERS[name] = (estimator, defaults)
+
+
+def make_learner(name, rstate=None, **params):
+    if name not in BASE_LEARNERS:
+        raise ValueError(f"Unknown learner '{name}'. Available: {sorted(BASE_LEARNERS)}")
+    estimator, defaults = BASE_LEARNERS[name]
+    if isinstance(estimator, str):
+        module, cls = estimator.rsplit(".", 1)
+        try:
+            estimator = getattr(import_module(module), cls)
+        except ImportError as e:
+            raise ImportError(f"Learner '{name}' requires the '{module}' package") from e
+    return estimator(**{"random_state": rstate, **defaults, **params})
+
+
+register_learner("elasticnet", ElasticNet, alpha=0.0005, l1_ratio=0.9)
+register_learner(
+    "lgbm",
+    LGBM,
+    n_estimators=3000,
+    learning_rate=0.03,
+    max_depth=-1,
+    num_leaves=31,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    n_jobs=-1,
+)
+register_learner(
+    "hgb", HistGradientBoostingRegressor, max_iter=1000, learning_rate=0.05, l2_regularization=1.0
+)
+register_learner(
+    "xgboost",
+    "xgboost.XGBRegressor",
+    n_estimators=3000,
+    learning_rate=0.03,
+    max_depth=4,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    n_jobs=-1,
+)
+register_learner(
+    "catboost",
+    "catboost.CatBoostRegressor",
+    iterations=3000,
+    learning_rate=0.03,
+    depth=6,
+    verbose=0,
+)
+
+
+def with_threads(model, n_threads):
+    # Fija el presupuesto de threads del modelo (LGBM n_jobs); ElasticNet no tiene n_jobs
+    if n_threads and "n_jobs" in model.get_params():
+        model.set_params(n_jobs=n_threads)
+    return model
+
+
+def _reproducible(model):
+    # LGBM elige histogramas row-wise o col-wise cronometrando ambos: con la carga de la
+    # máquina la elección (y el redondeo) cambia entre corridas. Se fija salvo que ya venga
+    if isinstance(model, LGBM) and not {"force_row_wise", "force_col_wise"} & set(model.get_params()):
+        model.set_params(force_row_wise=True)
+    return model
+
+
+# joblib.Memory invalida sólo si cambia el código de la función cacheada, no el de
+# build_preprocessor (otro módulo) ni sklearn: entran en la clave como argumento
+PREPROCESSOR_KEY = hashlib.sha256(
+    (inspect.getsource(build_preprocessor) + sklearn.__version__).encode()
+).hexdigest()[:16]
+
+
+def _fit_preprocessor(X_fit, X_other=None, sparse=False, key=PREPROCESSOR_KEY):
+    """Ajusta el preprocesador una sola vez y devuelve (pre, Xt_fit, Xt_other). key sólo va al cache."""
+    pre = build_preprocessor(X_fit, sparse=sparse)
+    Xt_fit = pre.fit_transform(X_fit)
+    Xt_other = pre.transform(X_other) if X_other is not None else None
+    return pre, Xt_fit, Xt_other
+
+
+def _cached(memory, fn):
+    return memory.cache(fn) if memory is not None else fn
+
+
+def _model_input(model, Xt):
+    # HistGradientBoosting no acepta matrices sparse; ElasticNet y LGBM usan el CSR tal cual
+    if sp.issparse(Xt) and isinstance(model, HistGradientBoostingRegressor):
+        return Xt.toarray()
+    return Xt
+
+
+def _boosting_callbacks(model, early_stopping_rounds=None, lr_decay=None):
+    # Solo LGBM: early stopping sobre el eval_set y learning rate lr * lr_decay**i
+    if not isinstance(model, LGBM):
+        return None
+    callbacks = []
+    if early_stopping_rounds:
+        callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+    if lr_decay:
+        lr = model.get_params()["learning_rate"]
+        callbacks.append(lgb.reset_parameter(learning_rate=lambda i: lr * lr_decay ** i))
+    return callbacks
+
+
+def _fit_fold(base_models, X_tr, y_tr, X_va, y_va, n_threads=None, memory=None,
+              early_stopping_rounds=None, lr_decay=None, sparse=False):
+    """
+    Entrena todos los modelos base en un fold. Devuelve (predicciones sobre X_va,
+    mejor iteración por modelo con early stopping).
+    """
+    limits = threadpool_limits(limits=n_threads) if n_threads else nullcontext()
+    with limits:
+        # Un solo fit del ColumnTransformer (PowerTransformer incluido) por fold;
+        # todos los modelos base se alimentan de las mismas matrices transformadas
+        _, Xt_tr, Xt_va = _cached(memory, _fit_preprocessor)(X_tr, X_va, sparse, key=PREPROCESSOR_KEY)
+        fold_preds, best_iters = {}, {}
+        for name, mdl in base_models.items():
+            model = _reproducible(with_threads(clone(mdl), n_threads))
+            X_fit, X_eval = _model_input(model, Xt_tr), _model_input(model, Xt_va)
+            callbacks = _boosting_callbacks(model, early_stopping_rounds, lr_decay)
+            if callbacks is None:
+                model.fit(X_fit, y_tr)
+            else:
+                model.fit(X_fit, y_tr, eval_set=[(X_eval, y_va)], callbacks=callbacks)
+                if early_stopping_rounds:
+                    best_iters[name] = int(model.best_iteration_)
+            fold_preds[name] = model.predict(X_eval)
+    return fold_preds, best_iters
+
+
+def _compile_preprocessor(pre):
+    """Parámetros del ColumnTransformer (num: median + Yeo-Johnson, cat: moda + one-hot) como arrays."""
+    tr = {name: (pipe, list(cols)) for name, pipe, cols in pre.transformers_ if name in ("num", "cat")}
+    num_pipe, num_cols = tr["num"]
+    cat_pipe, cat_cols = tr["cat"]
+
+    # SimpleImputer descarta columnas sin ningún valor observado
+    num_median = num_pipe.named_steps["imputer"].statistics_
+    num_keep = ~np.isnan(num_median.astype(float))
+    power = num_pipe.named_steps["power"]
+    cat_fill = cat_pipe.named_steps["imputer"].statistics_
+    cat_keep = np.array([v == v for v in cat_fill], dtype=bool)
+    categories = cat_pipe.named_steps["onehot"].categories_
+    for cats in categories:
+        if not all(isinstance(c, str) for c in cats):
+            raise ValueError("Compiled predictor only supports string categories")
+
+    arrays = {
+        "num_median": num_median[num_keep].astype(np.float64),
+        "yj_lambda": power.lambdas_.astype(np.float64),
+        "scaler_mean": power._scaler.mean_.astype(np.float64),
+        "scaler_scale": power._scaler.scale_.astype(np.float64),
+        "cat_fill": np.array([str(v) for v in cat_fill[cat_keep]], dtype=str),
+        "cat_vocab": np.concatenate([np.asarray(c, dtype=str) for c in categories]) if categories else np.array([], dtype=str),
+        "cat_offsets": np.cumsum([0] + [len(c) for c in categories]).astype(np.int64),
+    }
+    meta = {
+        "num_cols": [c for c, keep in zip(num_cols, num_keep) if keep],
+        "cat_cols": [c for c, keep in zip(cat_cols, cat_keep) if keep],
+    }
+    return arrays, meta
+
+
+def _compile_lgbm(model):
+    """
+    Árboles de LightGBM (LGBMRegressor o Booster) aplanados: hijo >= 0 es nodo
+    interno, < 0 es la hoja ~hijo.
+    """
+    missing_codes = {"None": 0, "Zero": 1, "NaN": 2}
+    cols = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "missing_type")}
+    leaf_value, roots = [], []
+
+    def visit(node):
+        if "leaf_value" in node or "split_feature" not in node:
+            leaf_value.append(node["leaf_value"])
+            return ~(len(leaf_value) - 1)
+        if node["decision_type"] != "<=":
+            raise ValueError(f"Unsupported LightGBM split: {node['decision_type']}")
+        i = len(cols["feature"])
+        for k in cols:
+            cols[k].append(0)
+        cols["feature"][i] = node["split_feature"]
+        cols["threshold"][i] = node["threshold"]
+        cols["default_left"][i] = node["default_left"]
+        cols["missing_type"][i] = missing_codes[node["missing_type"]]
+        cols["left"][i] = visit(node["left_child"])
+        cols["right"][i] = visit(node["right_child"])
+        return i
+
+    booster = model.booster_ if isinstance(model, LGBM) else model
+    dump = booster.dump_model()
+    for tree in dump["tree_info"]:
+        roots.append(visit(tree["tree_structure"]))
+
+    return {
+        "feature": np.array(cols["feature"], dtype=np.int32),
+        "threshold": np.array(cols["threshold"], dtype=np.float64),
+        "left": np.array(cols["left"], dtype=np.int64),
+        "right": np.array(cols["right"], dtype=np.int64),
+        "default_left": np.array(cols["default_left"], dtype=bool),
+        "missing_type": np.array(cols["missing_type"], dtype=np.int8),
+        "leaf_value": np.array(leaf_value, dtype=np.float64),
+        "roots": np.array(roots, dtype=np.int64),
+    }
+
+
+def simplex_weights(P, y):
+    """
+    Pesos w >= 0 con sum(w) = 1 que minimizan ||P @ w - y|| (stacking lineal).
+
+    Con sum(w) = 1, P @ w - y = (P - y) @ w, así que se resuelve un NNLS k x k
+    sobre el factor de Cholesky de la Gram de residuos más una fila de
+    penalización para la restricción de suma. Tras la Gram (un matmul) el
+    costo sólo depende del número de modelos.
+    """
+    P = np.asarray(P, dtype=float)
+    y = np.asarray(y, dtype=float)
+    k = P.shape[1]
+    if k == 1:
+        return np.ones(1)
+
+    R = P - y[:, None]
+    G = R.T @ R
+    jitter = 1e-12 * np.trace(G) + 1e-300
+    L = np.linalg.cholesky(G + jitter * np.eye(k))
+    lam = 1e4 * np.sqrt(np.max(np.diag(G)) + jitter)
+    A = np.vstack([L.T, np.full((1, k), lam)])
+    b = np.zeros(k + 1)
+    b[-1] = lam
+    w, _ = nnls(A, b)
+    total = w.sum()
+    return w / total if total > 0 else np.full(k, 1.0 / k)
+
+
+def simplex_grid(k, step):
+    """Todas las combinaciones de k pesos múltiplos de step que suman 1, shape (m, k)."""
+    n = int(round(1.0 / step))
+    # stars and bars: cada combinación de k-1 separadores entre n + k - 1 posiciones
+    rows = []
+    for bars in combinations(range(n + k - 1), k - 1):
+        edges = np.array((-1,) + bars + (n + k - 1,))
+        rows.append(np.diff(edges) - 1)
+    return np.asarray(rows, dtype=float) / n
+
+
+def grid_search_weights(P, y, step):
+    """Evalúa toda la rejilla del simplex con un solo matmul y devuelve (w, rmse, r2)."""
+    P = np.asarray(P, dtype=float)
+    y = np.asarray(y, dtype=float)
+    W = simplex_grid(P.shape[1], step)
+    err = P @ W.T - y[:, None]
+    sse = np.einsum("ij,ij->j", err, err)
+    best = int(np.argmin(sse))
+    rmse = float(np.sqrt(sse[best] / len(y)))
+    r2 = float(1.0 - sse[best] / np.sum((y - y.mean()) ** 2))
+    return W[best], rmse, r2
+
+
 class EnsembleModel:
-    def __init__(self, rstate):
+    """
+    Ensamble lineal de N modelos base del registro.
+
+    learners: nombres del registro, o dict nombre -> params que sobreescriben
+    los defaults. Los modelos finales quedan en self.pipes (también accesibles
+    como atributo, p.ej. model.lgbm) y predict() apila sus predicciones en una
+    matriz (n, N) que se combina con un solo producto por los pesos.
+    """
+
+    # Lotes chicos (filas x árboles <= numpy_trees_max_cells) evalúan LGBM con
+    # compiled.TreeEnsemble en vez de Booster.predict, que tiene ~1 ms de overhead
+    # por llamada. El cruce sale de benchmarks/bench_trees.py; 0 lo desactiva.
+    numpy_trees_max_cells = 12000
+    n_splits = 10
+
+    def __init__(self, rstate, n_jobs=1, threads_per_fold=None, cache_dir=None, learners=DEFAULT_LEARNERS,
+                 early_stopping_rounds=None, lr_decay=None, sparse=False):
         self.weights = None
-        self.elasticnet = None
-        self.lgbm = None
+        self.pipes = {}
         self.r2 = None
         self.rmse = None
         self.mse = None
         self.rmse_std = None
         self.rstate = rstate
+        # n_jobs: folds en paralelo (joblib/loky). threads_per_fold: threads por fold
+        # (LGBM n_jobs + BLAS); por defecto los CPUs repartidos entre los folds que corren
+        # a la vez, así que en secuencial cada fold usa todos.
+        self.n_jobs = n_jobs
+        self.threads_per_fold = threads_per_fold
+        # cache_dir: si se define, las matrices transformadas por fold se guardan con
+        # joblib.Memory y se releen memory-mapped en ejecuciones siguientes
+        self.cache_dir = cache_dir
+        # early_stopping_rounds: LGBM para en cada fold según su split de validación y el
+        # modelo final se entrena con la media de las mejores iteraciones. Default None (sin
+        # ES, n_estimators tal cual); model_training.ipynb lo activa con 200.
+        # lr_decay: learning rate por iteración lr * lr_decay**i (None = constante)
+        self.early_stopping_rounds = early_stopping_rounds
+        self.lr_decay = lr_decay
+        # sparse: el one-hot queda en CSR desde el ColumnTransformer hasta ElasticNet/LGBM
+        # (ver build_preprocessor); con muchas filas evita materializar la matriz densa
+        self.sparse = sparse
+        self.best_iterations = {}
+        if not isinstance(learners, dict):
+            learners = {name: {} for name in learners}
         self.base_models = {
-            "elasticnet": ElasticNet(alpha=0.0005, l1_ratio=0.9, random_state=rstate),
-            "lgbm": LGBM(
-                n_estimators=3000,
-                learning_rate=0.03,
-                max_depth=-1,
-                num_leaves=31,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                random_state=rstate,
-                n_jobs=-1,
-            ),
+            name: make_learner(name, rstate, **(params or {})) for name, params in learners.items()
         }
 
+    def __getattr__(self, name):
+        # model.elasticnet / model.lgbm / model.<learner> -> pipeline final de ese modelo
+        pipes = self.__dict__.get("pipes") or {}
+        if name in pipes:
+            return pipes[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def __setstate__(self, state):
+        # Pickles anteriores guardaban los modelos como atributos elasticnet / lgbm
+        if "pipes" not in state:
+            state["pipes"] = {
+                name: state.pop(name) for name in DEFAULT_LEARNERS if state.get(name) is not None
+            }
+        state.setdefault("best_iterations", {})
+        state.setdefault("early_stopping_rounds", None)
+        state.setdefault("lr_decay", None)
+        state.setdefault("sparse", False)
+        self.__dict__.update(state)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_tree_engines", None)  # se reconstruye al predecir
+        return state
+
     def fit(self, X, y):
-        kf = KFold(n_splits=10, shuffle=True, random_state=self.rstate)
+        kf = KFold(n_splits=self.n_splits, shuffle=True, random_state=self.rstate)
         oof_preds = {name: np.zeros(len(X), dtype=float) for name in self.base_models}
         oof_idx_mask = np.zeros(len(X), dtype=bool)
         fold_metrics = []
 
-        for fold, (tr_idx, va_idx) in enumerate(kf.split(X, y), 1):
-            X_tr, X_va = X.iloc[tr_idx], X.iloc[va_idx]
-            y_tr, y_va = y.iloc[tr_idx], y.iloc[va_idx]
-            pre = build_preprocessor(X_tr)
-            fold_preds = {}
-        for name, mdl in self.base_models.items():
-            pipe = Pipeline([("pre", clone(pre)), ("model", clone(mdl))])
-            pipe.fit(X_tr, y_tr)
-            p = pipe.predict(X_va)
-            fold_preds[name] = p
-        p_ens = np.mean(
-            np.column_stack([fold_preds[n] for n in self.base_models]), axis=1
+        splits = list(kf.split(X, y))
+        threads = self._fold_threads()
+        all_fold_preds = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_fold)(
+                self.base_models, X.iloc[tr_idx], y.iloc[tr_idx], X.iloc[va_idx], y.iloc[va_idx],
+                threads, self._memory(), self.early_stopping_rounds, self.lr_decay, self.sparse,
+            )
+            for tr_idx, va_idx in splits
         )
-        rmse = root_mean_squared_error(y_va, p_ens)
-        mse = np.mean((y_va - p_ens) ** 2)
-        r2 = r2_score(y_va, p_ens)
-        fold_metrics.append({"fold": fold, "rmse": float(rmse), "r2": float(r2) ,"mse": float(mse)})
-        for name in self.base_models:
-            oof_preds[name][va_idx] = fold_preds[name]
-        oof_idx_mask[va_idx] = True
+
+        self.best_iterations = {}
+        for _, fold_iters in all_fold_preds:
+            for name, it in fold_iters.items():
+                self.best_iterations.setdefault(name, []).append(it)
+
+        for fold, ((tr_idx, va_idx), (fold_preds, _)) in enumerate(zip(splits, all_fold_preds), 1):
+            y_va = y.iloc[va_idx]
+            p_ens = np.mean(
+                np.column_stack([fold_preds[n] for n in self.base_models]), axis=1
+            )
+            rmse = root_mean_squared_error(y_va, p_ens)
+            mse = np.mean((y_va - p_ens) ** 2)
+            r2 = r2_score(y_va, p_ens)
+            fold_metrics.append({"fold": fold, "rmse": float(rmse), "r2": float(r2) ,"mse": float(mse)})
+            for name in self.base_models:
+                oof_preds[name][va_idx] = fold_preds[name]
+            oof_idx_mask[va_idx] = True
 
         cv_rmse_mean = float(np.mean([m["rmse"] for m in fold_metrics]))
         cv_rmse_std = float(np.std([m["rmse"] for m in fold_metrics]))
@@ -79,49 +421,100 @@ class EnsembleModel:
         print(f"CV R2 mean: {cv_r2_mean:.4f}")
         print(f"CV MSE mean: {cv_mse_mean:.4f}")
 
-        grid_step = 0.05
-        best = {"weights": None, "rmse": np.inf, "r2": -np.inf}
-        y_true = y.values
-
-        for w1 in np.arange(0, 1 + 1e-9, grid_step):
-            w2 = 1 - w1
-            y_pred = w1 * oof_preds["elasticnet"] + w2 * oof_preds["lgbm"]
-            rmse = root_mean_squared_error(y_true, y_pred)
-            r2 = r2_score(y_true, y_pred)
-            if rmse < best["rmse"]:
-                best["weights"] = (w1, w2)
-                best["rmse"] = rmse
-                best["r2"] = r2
-                best['mse'] = mse
-
-        self.weights = {"elasticnet": best["weights"][0], "lgbm": best["weights"][1]}
+        P_oof = np.column_stack([oof_preds[n] for n in self.base_models])
+        self.weights = self._opt_weights(y.values, P_oof)
 
-        pre_final = build_preprocessor(X)
-        final_pipes = {}
-        for name, mdl in self.base_models.items():
-            pipe = Pipeline([("pre", clone(pre_final)), ("model", clone(mdl))])
-            pipe.fit(X, y)
-            final_pipes[name] = pipe
-
-        self.elasticnet = final_pipes["elasticnet"]
-        self.lgbm = final_pipes["lgbm"]
+        self.pipes = self._fit_final_pipes(X, y)
         self.r2 = cv_r2_mean
         self.rmse = cv_rmse_mean
         self.rmse_std = cv_rmse_std
         self.mse = cv_mse_mean
+        self.oof_preds = oof_preds
+        self.fold_metrics = fold_metrics
         
         return self
 
+    def _memory(self):
+        return Memory(self.cache_dir, mmap_mode="r", verbose=0) if self.cache_dir else None
+
+    def _fold_threads(self):
+        # Presupuesto explícito por fold (nunca el n_jobs=-1 de LGBM): CPUs / folds simultáneos.
+        # Con force_row_wise (_reproducible) el número de threads no cambia los OOF, así que
+        # n_jobs=1 con todos los CPUs y n_jobs>1 con menos threads dan lo mismo
+        if self.threads_per_fold:
+            return self.threads_per_fold
+        cpus = os.cpu_count() or 1
+        n_jobs = self.n_jobs if self.n_jobs > 0 else max(1, cpus + 1 + self.n_jobs)  # -1 = todos, como joblib
+        return max(1, cpus // min(n_jobs, self.n_splits, cpus))
+
+    def predict_matrix(self, X):
+        """Predicciones de cada modelo base apiladas en columnas, shape (n, N)."""
+        pre = {id(pipe.steps[0][1]) for pipe in self.pipes.values()}
+        if len(pre) == 1:
+            # Preprocesador compartido: se transforma X una sola vez para todos los modelos
+            Xt = next(iter(self.pipes.values())).steps[0][1].transform(X)
+            return np.column_stack([
+                self._predict_learner(name, pipe.steps[-1][1], Xt) for name, pipe in self.pipes.items()
+            ])
+        return np.column_stack([pipe.predict(X) for pipe in self.pipes.values()])
+
+    def _predict_learner(self, name, model, Xt):
+        if isinstance(model, LGBM) and self.numpy_trees_max_cells:
+            engine = self._tree_engine(name, model)
+            if Xt.shape[0] * engine.n_trees <= self.numpy_trees_max_cells:
+                # Lote chico: densificar unas pocas filas CSR es más barato que Booster.predict
+                return engine.predict(Xt.toarray() if sp.issparse(Xt) else Xt)
+        return model.predict(_model_input(model, Xt))
+
+    def _tree_engine(self, name, model):
+        engines = self.__dict__.setdefault("_tree_engines", {})
+        cached = engines.get(name)
+        if cached is None or cached[0] is not model:
+            cached = engines[name] = (model, TreeEnsemble.from_dump(_compile_lgbm(model)))
+        return cached[1]
+
+    def weight_vector(self):
+        return np.array([self.weights[name] for name in self.pipes], dtype=float)
+
     def predict(self, X):
-        p1 = self.elasticnet.predict(X)
-        p2 = self.lgbm.predict(X)
-        return np.expm1(self.weights["elasticnet"] * p1 + self.weights["lgbm"] * p2)
+        return np.expm1(self.predict_matrix(X) @ self.weight_vector())
 
     def get_params(self):
-        return {
-            "elasticnet": self.elasticnet.get_params(),
-            "lgbm": self.lgbm.get_params(),
-        }
+        return {name: pipe.get_params() for name, pipe in self.pipes.items()}
+
+    def export_compiled(self, path, trained_on_log=True):
+        """
+        Guarda el ensamble entrenado para compiled.CompiledEnsemble, que lo evalúa
+        sólo con NumPy. path *.npz escribe un solo archivo; cualquier otro path, un
+        directorio de .npy que los workers cargan memory-mapped y comparten.
+        Soporta modelos lineales (coef_) y LGBM.
+        """
+        pres = {id(pipe.steps[0][1]) for pipe in self.pipes.values()}
+        if len(pres) != 1:
+            raise ValueError("export_compiled needs all pipelines to share one preprocessor")
+        pre = next(iter(self.pipes.values())).steps[0][1]
+        arrays, meta = _compile_preprocessor(pre)
+
+        learners = []
+        for name, pipe in self.pipes.items():
+            model = pipe.steps[-1][1]
+            if isinstance(model, LGBM):
+                for k, v in TreeEnsemble.from_dump(_compile_lgbm(model)).arrays().items():
+                    arrays[f"{name}.{k}"] = v
+                learners.append({"name": name, "kind": "trees"})
+            elif hasattr(model, "coef_"):
+                arrays[f"{name}.coef"] = np.asarray(model.coef_, dtype=np.float64).ravel()
+                arrays[f"{name}.intercept"] = np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64))
+                learners.append({"name": name, "kind": "linear"})
+            else:
+                raise ValueError(f"Learner '{name}' ({type(model).__name__}) can't be compiled")
+
+        meta.update(
+            learners=learners,
+            weights={name: float(w) for name, w in self.weights.items()},
+            trained_on_log=trained_on_log,
+        )
+        return save_artifact(path, arrays, meta)
 
     def get_metrics(self):
         return {
@@ -132,60 +525,54 @@ class EnsembleModel:
         }
 
     def _build_final_pipes(self, X, y, use_log_target=True):
-        pre_final = build_preprocessor(X)
         y_train = np.log1p(y.values) if use_log_target else y.values
+        return self._fit_final_pipes(X, y_train)
 
+    def _fit_final_pipes(self, X, y_train):
+        # Todas las pipelines finales comparten el mismo preprocesador ya ajustado
+        pre_final, Xt, _ = _cached(self._memory(), _fit_preprocessor)(X, sparse=self.sparse, key=PREPROCESSOR_KEY)
         final_pipes = {}
         for name, mdl in self.base_models.items():
-            pipe = Pipeline([("pre", clone(pre_final)), ("model", clone(mdl))])
-            pipe.fit(X, y_train)
-            final_pipes[name] = pipe
+            model = clone(mdl)
+            if self.best_iterations.get(name):
+                model.set_params(n_estimators=self.final_iterations(name))
+            callbacks = _boosting_callbacks(model, lr_decay=self.lr_decay)
+            if callbacks:
+                model.fit(_model_input(model, Xt), y_train, callbacks=callbacks)
+            else:
+                model.fit(_model_input(model, Xt), y_train)
+            final_pipes[name] = Pipeline([("pre", pre_final), ("model", model)])
         return final_pipes
 
-    def _opt_weights_least_squares(self, y_true, p1, p2, clip01=True):
-        A = (p1 - p2).reshape(-1, 1)
-        b = y_true - p2
-        denom = (A.T @ A)[0, 0]
-        if denom <= 1e-12:
-            w = 0.5
-        else:
-            w = float((A.T @ b)[0] / denom)
-        if clip01:
-            w = float(np.clip(w, 0.0, 1.0))
-        return {"elasticnet": w, "lgbm": 1.0 - w}
+    def final_iterations(self, name):
+        # Iteraciones del modelo final: media de las mejores iteraciones de los folds
+        return max(1, int(round(np.mean(self.best_iterations[name]))))
+
+    def _opt_weights(self, y_true, P):
+        # P: una columna de predicciones por modelo base, en el orden de base_models
+        w = simplex_weights(P, y_true)
+        return dict(zip(self.base_models, w.tolist()))
 
     def fit_full(
         self, X, y, reuse_cv_weights=True, grid_fallback=False, use_log_target=True
     ):
-        final_pipes = self._build_final_pipes(X, y, use_log_target=use_log_target)
-        self.elasticnet = final_pipes["elasticnet"]
-        self.lgbm = final_pipes["lgbm"]
+        self.pipes = self._build_final_pipes(X, y, use_log_target=use_log_target)
+        P = self.predict_matrix(X)
 
         if reuse_cv_weights and isinstance(self.weights, dict):
             pass
         else:
-            p1 = self.elasticnet.predict(X)
-            p2 = self.lgbm.predict(X)
-
             y_train = np.log1p(y.values) if use_log_target else y.values
 
-            w = self._opt_weights_least_squares(y_train, p1, p2, clip01=True)
+            w = self._opt_weights(y_train, P)
 
             if grid_fallback:
-                best = {"w": w["elasticnet"], "rmse": np.inf}
-                for w1 in np.linspace(0, 1, 41):  # paso 0.025
-                    y_hat = w1 * p1 + (1 - w1) * p2
-                    rmse = root_mean_squared_error(y_train, y_hat)
-                    if rmse < best["rmse"]:
-                        best["w"] = w1
-                        best["rmse"] = rmse
-                w = {"elasticnet": best["w"], "lgbm": 1 - best["w"]}
+                w_grid, _, _ = grid_search_weights(P, y_train, step=0.025)
+                w = dict(zip(self.base_models, w_grid.tolist()))
 
             self.weights = w
 
-        y_train_pred = self.weights["elasticnet"] * self.elasticnet.predict(
-            X
-        ) + self.weights["lgbm"] * self.lgbm.predict(X)
+        y_train_pred = P @ self.weight_vector()
         y_train_true = np.log1p(y.values) if use_log_target else y.values
         self.rmse = float(root_mean_squared_error(y_train_true, y_train_pred))
         self.r2 = float(r2_score(y_train_true, y_train_pred))
@@ -193,7 +580,5 @@ class EnsembleModel:
         return self
 
     def predict_full(self, X, trained_on_log=True):
-        p1 = self.elasticnet.predict(X)
-        p2 = self.lgbm.predict(X)
-        pred = self.weights["elasticnet"] * p1 + self.weights["lgbm"] * p2
+        pred = self.predict_matrix(X) @ self.weight_vector()
         return np.expm1(pred) if trained_on_log else pred
@@ -0,0 +1,305 @@
+"""
+Entrenamiento out-of-core de LGBM para datasets que no entran en memoria.
+
+Lee el CSV o Parquet en bloques y nunca tiene el dataset completo en pandas:
+
+  1. Estadísticas: una pasada con una muestra reservoir de sample_rows filas
+     (medianas de imputación, medianas + Yeo-Johnson + estandarización del
+     preprocesador) y conteos exactos de cada categoría (vocabulario del
+     one-hot y moda).
+  2. Transformación: cada bloque pasa por make_features y por el mismo
+     transform que usa el predictor compilado, y se escribe como .npy en
+     work_dir (una fracción valid_fraction va al set de validación).
+  3. LightGBM construye el Dataset leyendo esos .npy por lotes
+     (lgb.Sequence), lo guarda en binario y entrena desde el binario con
+     early stopping sobre validación.
+
+El resultado es un artefacto de compiled.CompiledEnsemble (learner "lgbm" con
+peso 1) que el server carga con COMPILED_MODEL_PATH, más el imputation.json
+para IMPUTATION_PATH (junto al artefacto).
+
+memory_mb acota los bloques y la muestra; lo único que escala con el número
+de filas es el Dataset binario de LightGBM (~1 byte por fila por grupo de
+features tras el bundling del one-hot), que se reporta al terminar.
+
+Uso (desde ML/models/ensemble_elnet_lgbm/):
+    python out_of_core.py ../../../data/housing_data/train.csv ../../../artifacts/ooc --memory-mb 1024
+"""
+import sys
+
+sys.path.append("../../../")
+from utils.utils_yose import make_features, build_preprocessor, fit_imputation_stats, save_imputation_stats
+
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+try:
+    from compiled import TreeEnsemble, save_artifact, transform_features
+    from ensemble import make_learner, _compile_preprocessor, _compile_lgbm
+except ImportError:
+    from .compiled import TreeEnsemble, save_artifact, transform_features
+    from .ensemble import make_learner, _compile_preprocessor, _compile_lgbm
+
+
+PROBE_ROWS = 1000
+# Copias del bloque vivas a la vez: el leído, las 3 de make_features y la matriz transformada
+_WORKING_COPIES = 5
+MB = 1024 * 1024
+
+
+def read_chunks(path, chunk_rows, dtype=None, columns=None):
+    """DataFrames de hasta chunk_rows filas desde un CSV o Parquet, sin cargar el archivo completo."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            df = batch.to_pandas()
+            # Las columnas dictionary-encoded llegan como category; make_features espera object
+            for col in df.select_dtypes(include=["category"]).columns:
+                df[col] = df[col].astype(object)
+            yield df
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtype, usecols=columns)
+
+
+def probe(path):
+    """(dtype para read_csv, bytes por fila en pandas) a partir de las primeras filas."""
+    df = next(read_chunks(path, PROBE_ROWS))
+    # Fija como object las columnas de texto: un bloque sin valores no debe cambiar su tipo
+    dtype = {col: object for col in df.select_dtypes(include=["object"]).columns}
+    return dtype, df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def budget_rows(memory_mb, row_bytes, fraction=0.25):
+    """Filas por bloque (o de la muestra) para que su working set use ~fraction del presupuesto."""
+    return max(PROBE_ROWS, int(memory_mb * MB * fraction / (row_bytes * _WORKING_COPIES)))
+
+
+def fit_stream_stats(path, target, chunk_rows, sample_rows, rstate=42, dtype=None, drop=("Id",)):
+    """
+    Primera pasada: (arrays, meta) del preprocesador, estadísticas de imputación y
+    número de filas. Las numéricas salen de una muestra reservoir; las categorías
+    y sus modas son exactas.
+    """
+    rng = np.random.default_rng(rstate)
+    sample, keys = None, None
+    cat_counts = {}
+    n_rows = 0
+    for chunk in read_chunks(path, chunk_rows, dtype=dtype):
+        n_rows += len(chunk)
+        # Reservoir bottom-k: cada fila recibe una clave uniforme y quedan las sample_rows menores
+        k = rng.random(len(chunk))
+        sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        keys = k if keys is None else np.concatenate([keys, k])
+        if len(sample) > sample_rows:
+            keep = np.sort(np.argpartition(keys, sample_rows)[:sample_rows])
+            sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+
+        # Las categóricas de make_features no dependen de las medianas de imputación
+        feats = make_features(chunk.drop(columns=[target, *drop], errors="ignore"))
+        for col in feats.select_dtypes(include=["object"]).columns:
+            acc = cat_counts.setdefault(col, {})
+            for value, count in feats[col].value_counts().items():
+                acc[str(value)] = acc.get(str(value), 0) + int(count)
+
+    X_sample = sample.drop(columns=[target, *drop], errors="ignore")
+    imputation_stats = fit_imputation_stats(X_sample)
+    feats = make_features(X_sample, stats=imputation_stats)
+    arrays, meta = _compile_preprocessor(build_preprocessor(feats).fit(feats))
+
+    # Vocabulario y moda exactos del stream (ordenados como OneHotEncoder.categories_)
+    vocab = [np.sort(np.array(list(cat_counts[col]), dtype=str)) for col in meta["cat_cols"]]
+    arrays["cat_vocab"] = np.concatenate(vocab) if vocab else np.array([], dtype=str)
+    arrays["cat_offsets"] = np.cumsum([0] + [len(v) for v in vocab]).astype(np.int64)
+    # Empates: la menor, como SimpleImputer(strategy="most_frequent")
+    arrays["cat_fill"] = np.array(
+        [min(cat_counts[col].items(), key=lambda kv: (-kv[1], kv[0]))[0] for col in meta["cat_cols"]],
+        dtype=str,
+    )
+    return arrays, meta, imputation_stats, n_rows
+
+
+class _NpySequence(lgb.Sequence):
+    # Bloque transformado en disco; LightGBM lo lee por rangos de batch_size filas.
+    # Se lee con pread en vez de mmap: las páginas leídas no quedan contadas en el RSS
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fh:
+            np.lib.format.read_magic(fh)
+            self.shape, _, self.dtype = np.lib.format.read_array_header_1_0(fh)
+            self.offset = fh.tell()
+        self.row_bytes = self.shape[1] * self.dtype.itemsize
+
+    def _read(self, start, stop):
+        out = np.fromfile(self.path, dtype=self.dtype, count=(stop - start) * self.shape[1],
+                          offset=self.offset + start * self.row_bytes)
+        return out.reshape(stop - start, self.shape[1])
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, _ = idx.indices(len(self))
+            return self._read(start, stop)
+        if isinstance(idx, (list, np.ndarray)):
+            return np.vstack([self._read(i, i + 1) for i in idx])
+        return self._read(idx, idx + 1)[0]
+
+    def __len__(self):
+        return self.shape[0]
+
+
+def write_transformed(path, target, arrays, meta, imputation_stats, work_dir, chunk_rows,
+                      valid_fraction=0.1, rstate=42, dtype=None, drop=("Id",)):
+    """
+    Segunda pasada: escribe cada bloque transformado en work_dir. Devuelve
+    {"train": (archivos, y), "valid": (archivos, y)} con y en log1p.
+    """
+    rng = np.random.default_rng(rstate + 1)
+    out = {"train": ([], []), "valid": ([], [])}
+    for i, chunk in enumerate(read_chunks(path, chunk_rows, dtype=dtype)):
+        y = np.log1p(chunk[target].to_numpy(dtype=np.float64))
+        feats = make_features(chunk.drop(columns=[target, *drop], errors="ignore"), stats=imputation_stats)
+        Xt = transform_features(arrays, meta["num_cols"], meta["cat_cols"], feats)
+        is_valid = rng.random(len(Xt)) < valid_fraction
+        for split, mask in (("train", ~is_valid), ("valid", is_valid)):
+            if not mask.any():
+                continue
+            f = os.path.join(work_dir, f"{split}_{i:05d}.npy")
+            np.save(f, Xt[mask], allow_pickle=False)
+            out[split][0].append(f)
+            out[split][1].append(y[mask])
+    return {split: (files, np.concatenate(ys) if ys else np.array([])) for split, (files, ys) in out.items()}
+
+
+def _train_params(rstate, **params):
+    # Mismos defaults que el learner "lgbm" del registro, con los nombres de lgb.train (alias)
+    p = make_learner("lgbm", rstate, **params).get_params()
+    train_params = {
+        "objective": p["objective"] or "regression",
+        "learning_rate": p["learning_rate"],
+        "num_leaves": p["num_leaves"],
+        "max_depth": p["max_depth"],
+        "min_child_samples": p["min_child_samples"],
+        "subsample": p["subsample"],
+        "subsample_freq": p["subsample_freq"],
+        "colsample_bytree": p["colsample_bytree"],
+        "reg_alpha": p["reg_alpha"],
+        "reg_lambda": p["reg_lambda"],
+        "seed": p["random_state"],
+        "num_threads": p["n_jobs"] if p["n_jobs"] and p["n_jobs"] > 0 else 0,
+        "verbose": -1,
+    }
+    return train_params, p["n_estimators"]
+
+
+def train_out_of_core(path, out_path, target="SalePrice", memory_mb=1024, chunk_rows=None,
+                      sample_rows=None, valid_fraction=0.1, early_stopping_rounds=200,
+                      work_dir=None, rstate=42, **lgbm_params):
+    """
+    Entrena LGBM sobre path (CSV o .parquet) con memoria acotada por memory_mb y
+    guarda el artefacto compilado en out_path. Devuelve un dict con el resumen.
+    """
+    t0 = time.perf_counter()
+    dtype, row_bytes = probe(path)
+    chunk_rows = chunk_rows or budget_rows(memory_mb, row_bytes)
+    sample_rows = sample_rows or min(200_000, budget_rows(memory_mb, row_bytes))
+    work_dir = work_dir or f"{out_path.rstrip('/')}.work"
+    os.makedirs(work_dir, exist_ok=True)
+    print(f"chunk_rows={chunk_rows} sample_rows={sample_rows} (~{row_bytes:.0f} B/fila en pandas)")
+
+    arrays, meta, imputation_stats, n_rows = fit_stream_stats(
+        path, target, chunk_rows, sample_rows, rstate=rstate, dtype=dtype
+    )
+    print(f"Stats: {n_rows} filas, {len(meta['num_cols'])} numéricas, {len(meta['cat_cols'])} categóricas "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+    parts = write_transformed(
+        path, target, arrays, meta, imputation_stats, work_dir, chunk_rows,
+        valid_fraction=valid_fraction, rstate=rstate, dtype=dtype,
+    )
+    params, n_estimators = _train_params(rstate, **lgbm_params)
+    # LightGBM arma los bins con una muestra de filas en memoria (default 200000); con una
+    # muestra menor que el dataset avisa "Using too small bin_construct_sample_cnt", es esperado
+    n_features = len(meta["num_cols"]) + int(arrays["cat_offsets"][-1])
+    params["bin_construct_sample_cnt"] = min(200_000, budget_rows(memory_mb, n_features * 8 / _WORKING_COPIES * 2))
+
+    # Dataset binario: se construye leyendo los .npy por lotes y queda en disco
+    bins = {}
+    reference = None
+    for split in ("train", "valid"):
+        files, y = parts[split]
+        if not files:
+            continue
+        bins[split] = os.path.join(work_dir, f"{split}.bin")
+        ds = lgb.Dataset([_NpySequence(f) for f in files], label=y, params=params, reference=reference)
+        ds.save_binary(bins[split])
+        if split == "train":
+            reference = ds
+        for f in files:
+            os.remove(f)
+    del reference, ds
+    print(f"Dataset binario: {os.path.getsize(bins['train']) / MB:.1f} MB ({time.perf_counter() - t0:.1f}s)")
+
+    train_set = lgb.Dataset(bins["train"], params=params)
+    valid_sets, callbacks = [], []
+    if "valid" in bins and early_stopping_rounds:
+        valid_sets = [lgb.Dataset(bins["valid"], reference=train_set)]
+        callbacks = [lgb.early_stopping(early_stopping_rounds, verbose=False)]
+    booster = lgb.train(params, train_set, num_boost_round=n_estimators,
+                        valid_sets=valid_sets, callbacks=callbacks)
+
+    for k, v in TreeEnsemble.from_dump(_compile_lgbm(booster)).arrays().items():
+        arrays[f"lgbm.{k}"] = v
+    meta.update(
+        learners=[{"name": "lgbm", "kind": "trees"}],
+        weights={"lgbm": 1.0},
+        trained_on_log=True,
+        imputation_stats=imputation_stats,
+    )
+    save_artifact(out_path, arrays, meta)
+    # Las medianas de imputación también van aparte, en el formato de IMPUTATION_PATH del server
+    imputation_path = os.path.join(out_path if os.path.isdir(out_path) else os.path.dirname(out_path) or ".",
+                                   "imputation.json")
+    save_imputation_stats(imputation_stats, imputation_path)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {
+        "rows": n_rows,
+        "train_rows": len(parts["train"][1]),
+        "valid_rows": len(parts["valid"][1]),
+        "best_iteration": booster.best_iteration or booster.current_iteration(),
+        "valid_rmse": float(booster.best_score.get("valid_0", {}).get("l2", np.nan) ** 0.5),
+        "seconds": time.perf_counter() - t0,
+    }
+    print(summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena LGBM out-of-core sobre un CSV o Parquet")
+    parser.add_argument("path")
+    parser.add_argument("out_path", help="directorio (o .npz) del artefacto compilado")
+    parser.add_argument("--target", default="SalePrice")
+    parser.add_argument("--memory-mb", type=int, default=1024)
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--sample-rows", type=int, default=None)
+    parser.add_argument("--valid-fraction", type=float, default=0.1)
+    parser.add_argument("--early-stopping-rounds", type=int, default=200)
+    parser.add_argument("--n-estimators", type=int, default=None)
+    args = parser.parse_args()
+
+    lgbm_params = {"n_estimators": args.n_estimators} if args.n_estimators else {}
+    train_out_of_core(
+        args.path, args.out_path, target=args.target, memory_mb=args.memory_mb,
+        chunk_rows=args.chunk_rows, sample_rows=args.sample_rows, valid_fraction=args.valid_fraction,
+        early_stopping_rounds=args.early_stopping_rounds, **lgbm_params,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Scoring offline por lotes (submissions, revaluación nocturna del inventario).
+
+Lee el archivo de entrada (CSV o Parquet, de cualquier tamaño) en bloques,
+aplica make_features (versión compilada de utils.feature_plan, mismo
+resultado) + predict_full del modelo en un pool de procesos y
+escribe Id,SalePrice en el mismo orden que la entrada, a CSV o Parquet según
+la extensión de salida. La salida se escribe en <output>.tmp y se renombra al
+terminar, así un job que falla no deja un archivo a medias.
+
+El modelo es un pickle de joblib de EnsembleModel o un artefacto de
+export_compiled (directorio o .npz). Las medianas de imputación salen de
+--imputation, o del meta del artefacto si las trae (out_of_core.py); sin
+ninguna de las dos make_features usa las medianas de cada bloque y el
+resultado depende de --chunk-rows.
+
+Uso (desde ML/models/ensemble_elnet_lgbm/):
+    python score.py model/ensemble ../../../data/housing_data/test.csv submission.csv \\
+        --imputation ../../../server/models/imputation.json --workers 4
+"""
+import sys
+
+sys.path.append("../../../")
+from utils.resources import available_cpus
+from utils.utils_yose import load_imputation_stats
+from utils.feature_plan import make_features_fast, ImputationTable
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+
+try:
+    from compiled import CompiledEnsemble, load_artifact
+    from ensemble import with_threads
+    from out_of_core import read_chunks, probe
+except ImportError:
+    from .compiled import CompiledEnsemble, load_artifact
+    from .ensemble import with_threads
+    from .out_of_core import read_chunks, probe
+
+
+TARGET = "SalePrice"
+
+# Estado de cada proceso del pool (se carga una vez en _init_worker)
+_model = None
+_stats = None
+
+
+def load_model(path):
+    if os.path.isdir(path) or path.endswith(".npz"):
+        return CompiledEnsemble.load(path)
+    return joblib.load(path)
+
+
+def _init_worker(model_path, imputation_stats, n_threads):
+    global _model, _stats
+    _model = load_model(model_path)
+    _stats = ImputationTable(imputation_stats) if imputation_stats else None
+    # Sin esto cada worker usaría todos los cores en LGBM (n_jobs=-1)
+    for pipe in getattr(_model, "pipes", {}).values():
+        with_threads(pipe.steps[-1][1], n_threads)
+
+
+def score_chunk(chunk, start, id_col="Id"):
+    """(ids, precios) de un bloque; sin columna id_col, el id es el número de fila."""
+    if id_col in chunk:
+        ids = chunk[id_col].to_numpy()
+    else:
+        ids = pd.RangeIndex(start, start + len(chunk)).to_numpy()
+    X = make_features_fast(chunk.drop(columns=[id_col, TARGET], errors="ignore"), _stats)
+    return ids, _model.predict_full(X)
+
+
+def _ordered(pool, chunks, max_inflight, id_col):
+    # Como pool.map pero con a lo sumo max_inflight bloques leídos y sin escribir
+    pending = deque()
+    start = 0
+    for chunk in chunks:
+        pending.append(pool.submit(score_chunk, chunk, start, id_col))
+        start += len(chunk)
+        if len(pending) >= max_inflight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _Writer:
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.tmp_path = f"{path}.tmp"
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.tmp_path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.tmp_path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._first:  # entrada vacía: igual se escribe el archivo, sólo con el encabezado
+            self.write(pd.DataFrame({col: pd.Series(dtype="float64") for col in self.columns}))
+        if self._parquet is not None:
+            self._parquet.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def score_file(model_path, input_path, output_path, chunk_rows=50_000, workers=None,
+               imputation_stats=None, id_col="Id"):
+    """Puntúa input_path completo y escribe output_path. Devuelve (filas, segundos)."""
+    workers = available_cpus() if workers is None else workers
+    if imputation_stats is None and (os.path.isdir(model_path) or model_path.endswith(".npz")):
+        imputation_stats = load_artifact(model_path)[1].get("imputation_stats")
+    if imputation_stats is None:
+        print("Sin imputation stats: se imputan con las medianas de cada bloque", file=sys.stderr)
+
+    dtype, _ = probe(input_path)
+    chunks = read_chunks(input_path, chunk_rows, dtype=dtype)
+    n_threads = max(1, available_cpus() // max(workers, 1))
+    writer = _Writer(output_path, [id_col, TARGET])
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(model_path, imputation_stats, n_threads))
+        results = _ordered(pool, chunks, 2 * workers, id_col)
+    else:
+        _init_worker(model_path, imputation_stats, n_threads)
+        results = (score_chunk(chunk, i * chunk_rows, id_col) for i, chunk in enumerate(chunks))
+
+    t0 = time.perf_counter()
+    rows = 0
+    try:
+        for ids, pred in results:
+            writer.write(pd.DataFrame({id_col: ids, TARGET: pred}))
+            rows += len(pred)
+            elapsed = time.perf_counter() - t0
+            print(f"{rows} filas, {rows / elapsed:,.0f} filas/s", file=sys.stderr, flush=True)
+        writer.close()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if os.path.exists(writer.tmp_path):
+            os.remove(writer.tmp_path)
+    elapsed = time.perf_counter() - t0
+    print(f"{rows} filas en {elapsed:.1f}s ({rows / elapsed:,.0f} filas/s, {workers} workers) -> {output_path}",
+          file=sys.stderr)
+    return rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring offline por lotes con el ensamble")
+    parser.add_argument("model_path", help="pickle de EnsembleModel o artefacto de export_compiled")
+    parser.add_argument("input_path", help="CSV o .parquet con las columnas de test.csv")
+    parser.add_argument("output_path", help="CSV o .parquet de salida (Id,SalePrice)")
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None, help="default: CPUs disponibles; 1 = sin pool")
+    parser.add_argument("--imputation", default=None, help="JSON de utils_yose.save_imputation_stats")
+    parser.add_argument("--id-col", default="Id")
+    args = parser.parse_args()
+
+    stats = load_imputation_stats(args.imputation) if args.imputation else None
+    if args.imputation and stats is None:
+        parser.error(f"No existe {args.imputation}")
+    score_file(args.model_path, args.input_path, args.output_path, chunk_rows=args.chunk_rows,
+               workers=args.workers, imputation_stats=stats, id_col=args.id_col)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Memoria por worker según el formato del modelo.
+
+Entrena el ensamble (ElasticNet + LGBM de n_estimators árboles), lo guarda
+como pickle de joblib, como .npz compilado y como directorio compilado
+(memory-mapped), y levanta N procesos que cargan cada formato y predicen.
+Con todos vivos a la vez reporta por worker cuánto creció RSS, USS (memoria
+propia) y PSS (memoria compartida prorrateada) desde antes de cargar.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_artifact_rss.py [n_workers] [n_estimators]
+"""
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import warnings
+
+import joblib
+import numpy as np
+import psutil
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "ML", "models", "ensemble_elnet_lgbm"))
+
+warnings.filterwarnings("ignore")
+
+DATA_DIR = os.path.join(ROOT, "data", "housing_data")
+MB = 1024 * 1024
+
+
+def _worker(fmt, path, X, barrier, results):
+    proc = psutil.Process()
+    base = proc.memory_full_info()
+    if fmt == "pickle":
+        model = joblib.load(path)  # importa sklearn + lightgbm, como el server hoy
+    else:
+        from compiled import CompiledEnsemble
+        model = CompiledEnsemble.load(path)
+    model.predict_full(X)
+
+    barrier.wait()  # todos los workers con el modelo cargado
+    info = proc.memory_full_info()
+    results.put((info.rss - base.rss, info.uss - base.uss, info.pss - base.pss))
+    barrier.wait()
+
+
+def _measure(fmt, path, X, n_workers):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(fmt, path, X, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return np.mean(rows, axis=0) / MB
+
+
+def main():
+    from utils.utils_yose import load_data, make_features
+    from ensemble import EnsembleModel
+
+    n_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n_estimators = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+
+    train, test = load_data(DATA_DIR)
+    X = make_features(train.drop(columns=["Id", "SalePrice"]))
+    X_test = make_features(test.drop(columns=["Id"])).head(100)
+    y = np.log1p(train["SalePrice"])
+
+    model = EnsembleModel(42, learners={"elasticnet": {}, "lgbm": {"n_estimators": n_estimators, "verbose": -1}})
+    model.pipes = model._fit_final_pipes(X, y)
+    model.weights = {"elasticnet": 0.5, "lgbm": 0.5}
+
+    tmp = tempfile.mkdtemp()
+    try:
+        paths = {
+            "pickle": os.path.join(tmp, "ensemble.pkl"),
+            "npz": os.path.join(tmp, "ensemble.npz"),
+            "mmap dir": os.path.join(tmp, "ensemble"),
+        }
+        joblib.dump(model, paths["pickle"])
+        model.export_compiled(paths["npz"])
+        model.export_compiled(paths["mmap dir"])
+
+        print(f"workers={n_workers} trees={n_estimators}")
+        print(f"{'format':>10} {'RSS':>10} {'USS':>10} {'PSS':>10}  (MB por worker)")
+        for fmt, path in paths.items():
+            rss, uss, pss = _measure("pickle" if fmt == "pickle" else "compiled", path, X_test, n_workers)
+            print(f"{fmt:>10} {rss:>10.1f} {uss:>10.1f} {pss:>10.1f}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Carga de datos: pd.read_csv (load_data) vs los .arrow/.parquet de convert_to_columnar.
+
+Replica train.csv/test.csv N veces en un directorio temporal, los convierte una
+vez y mide cada forma de carga en un proceso nuevo: tiempo y cuánto creció el
+RSS, separado en memoria anónima (copias propias del proceso) y páginas de
+archivo mapeadas (page cache, compartidas y recuperables por el kernel).
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_columnar.py [escalas]
+    python benchmarks/bench_columnar.py 1,100
+"""
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+from utils.utils_yose import load_data, load_data_columnar, convert_to_columnar
+
+warnings.filterwarnings("ignore")
+
+DATA_DIR = os.path.join(ROOT, "data", "housing_data")
+MB = 1024 * 1024
+PROJECTION = [
+    "OverallQual", "GrLivArea", "Neighborhood", "YearBuilt", "TotalBsmtSF",
+    "GarageCars", "KitchenQual", "LotArea", "ExterQual", "SalePrice",
+]
+
+
+def _rss():
+    # (anónima, archivo) en MB, de /proc/self/status
+    vals = {}
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(("RssAnon", "RssFile")):
+                key, kb = line.split(":")
+                vals[key] = int(kb.split()[0]) / 1024
+    return vals["RssAnon"], vals["RssFile"]
+
+
+LOADERS = {
+    "read_csv": lambda d: load_data(d),
+    "parquet": lambda d: (pd.read_parquet(os.path.join(d, "train.parquet")),
+                          pd.read_parquet(os.path.join(d, "test.parquet"))),
+    "arrow copia": lambda d: load_data_columnar(d),
+    "arrow": lambda d: load_data_columnar(d, copy=False),
+    "arrow category": lambda d: load_data_columnar(d, categorical=True, copy=False),
+    "arrow 10 cols": lambda d: load_data_columnar(d, columns=PROJECTION, copy=False),
+}
+
+
+def _run(name, data_dir, results):
+    import pyarrow  # noqa: F401  (el import no cuenta en la medición)
+
+    anon0, file0 = _rss()
+    t0 = time.perf_counter()
+    frames = LOADERS[name](data_dir)
+    elapsed = time.perf_counter() - t0
+    anon1, file1 = _rss()
+    results.put((elapsed, anon1 - anon0, file1 - file0, sum(len(f) for f in frames)))
+
+
+def main():
+    scales = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1, 100]
+    ctx = mp.get_context("spawn")
+
+    print(f"{'scale':>6} {'rows':>8} {'loader':>15} {'time':>10} {'anon':>10} {'file':>10}")
+    for scale in scales:
+        tmp = tempfile.mkdtemp()
+        try:
+            for name in ("train", "test"):
+                df = pd.read_csv(os.path.join(DATA_DIR, f"{name}.csv"))
+                pd.concat([df] * scale, ignore_index=True).to_csv(os.path.join(tmp, f"{name}.csv"), index=False)
+            convert_to_columnar(tmp)
+
+            for loader in LOADERS:
+                results = ctx.Queue()
+                p = ctx.Process(target=_run, args=(loader, tmp, results))
+                p.start()
+                elapsed, anon, filemb, rows = results.get()
+                p.join()
+                print(f"{scale:>5}x {rows:>8} {loader:>15} {elapsed * 1e3:>7.1f} ms {anon:>7.1f} MB {filemb:>7.1f} MB",
+                      flush=True)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark make_features vs el plan compilado (utils.feature_plan).
+Que la salida sea idéntica lo prueba server/tests/test_feature_plan.py.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_features.py
+"""
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from utils.utils_yose import load_data, make_features
+from utils.feature_plan import make_features_fast
+
+warnings.filterwarnings("ignore")
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "housing_data")
+BATCH_SIZES = [1, 100, 100_000]
+
+
+def _timeit(fn, df, repeat):
+    fn(df)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(df)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    _, test = load_data(DATA_DIR)
+    test = test.drop(columns=["Id"])
+
+    print(f"{'batch':>8} {'make_features':>15} {'feature_plan':>15} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        reps = -(-n // len(test))
+        df = pd.concat([test] * reps, ignore_index=True).iloc[:n]
+
+        repeat = 3 if n >= 10_000 else 50
+        t_ref = _timeit(make_features, df, repeat)
+        t_new = _timeit(make_features_fast, df, repeat)
+        print(f"{n:>8} {t_ref * 1e3:>12.2f} ms {t_new * 1e3:>12.2f} ms {t_ref / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Cliente LLM (server/src/llm_client.py) contra un servidor Groq falso con latencia inyectada.
+
+Levanta en un hilo un servidor local compatible con /openai/v1/chat/completions
+que responde en FAST_MS, salvo una fracción TAIL_RATIO de requests que tarda
+TAIL_MS (la cola lenta del proveedor). La cola tiene que ser < 5%: si no,
+el p95 cae dentro de ella y el hedge llega tan tarde como la request lenta.
+El Agent de pydantic-ai apunta ahí vía GROQ_BASE_URL, igual que en routes.py,
+y se comparan:
+
+  - sin hedge: una sola request por llamada (comportamiento anterior)
+  - con hedge: segunda request idéntica pasado el p95 de latencias recientes
+  - caída: el servidor devuelve 500; el breaker abre y rechaza sin llamar
+    upstream, y vuelve a cerrar cuando el servidor se recupera
+
+Las conexiones se cuentan del lado del servidor (puertos de cliente distintos):
+con el pool compartido y keep-alive deberían ser ~concurrencia, no ~llamadas
+(más una por hedge perdido: cancelar una request a medias cierra su conexión).
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_llm_hedging.py [llamadas] [concurrencia]
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+os.environ.setdefault("PYDANTIC_AI_NO_BANNER", "1")
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "server", "src"))
+from llm_client import CircuitBreaker, ResilientCaller, make_groq_model, make_http_client
+
+FAST_MS = 40
+TAIL_MS = 1500
+TAIL_RATIO = 0.04
+
+fake = FastAPI()
+fake.state.fail = False
+fake.state.requests = 0
+fake.state.ports = set()
+
+
+@fake.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    fake.state.requests += 1
+    fake.state.ports.add(request.client.port)
+    if fake.state.fail:
+        return JSONResponse({"error": {"message": "upstream down", "type": "server_error"}}, status_code=500)
+    slow = random.random() < TAIL_RATIO
+    await asyncio.sleep((TAIL_MS if slow else FAST_MS) / 1000)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": json.dumps({"OverallQual": 7})},
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _start_server():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake, log_level="error"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def _quantile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _run(agent, caller, n_calls, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = {}
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await caller.call(lambda: agent.run("casa de 3 dormitorios"))
+                latencies.append(time.perf_counter() - t0)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    await asyncio.gather(*(one() for _ in range(n_calls)))
+    return latencies, errors
+
+
+async def _phase(name, caller, n_calls, concurrency):
+    from pydantic_ai import Agent
+
+    client = make_http_client(timeout=10, connect_timeout=2, max_connections=concurrency * 2, keepalive=concurrency * 2)
+    agent = Agent(make_groq_model("fake-model", client, api_key="fake"))
+    fake.state.requests = 0
+    fake.state.ports = set()
+    # Calentamiento: la ventana de latencias necesita muestras antes de hedgear
+    await _run(agent, caller, 40, concurrency)
+    fake.state.requests = 0
+    fake.state.ports = set()
+    hedges0, retries0 = caller.hedges, caller.retries
+
+    t0 = time.perf_counter()
+    latencies, errors = await _run(agent, caller, n_calls, concurrency)
+    wall = time.perf_counter() - t0
+    await client.aclose()
+    print(f"{name:>10} {_quantile(latencies, 0.5) * 1e3:>7.0f} {_quantile(latencies, 0.95) * 1e3:>7.0f} "
+          f"{_quantile(latencies, 0.99) * 1e3:>7.0f} {max(latencies) * 1e3:>7.0f} "
+          f"{caller.hedges - hedges0:>7} {caller.retries - retries0:>7} {fake.state.requests:>8} "
+          f"{len(fake.state.ports):>6} {wall:>6.1f}s {errors or ''}", flush=True)
+
+
+async def _outage():
+    from pydantic_ai import Agent
+
+    client = make_http_client(timeout=10, connect_timeout=2)
+    agent = Agent(make_groq_model("fake-model", client, api_key="fake"))
+    caller = ResilientCaller(attempt_timeout=5, max_attempts=2, hedge=False,
+                             breaker=CircuitBreaker(failure_threshold=5, reset_seconds=1.0))
+
+    fake.state.fail = True
+    fake.state.requests = 0
+    _, errors = await _run(agent, caller, 50, 1)
+    print(f"\ncaída: 50 llamadas -> {fake.state.requests} requests upstream, errores {errors}, "
+          f"breaker {caller.breaker.state} (opens={caller.breaker.opens}, rejected={caller.breaker.rejected})")
+
+    fake.state.fail = False
+    await asyncio.sleep(1.1)
+    print(f"tras {caller.breaker.reset_seconds:.0f}s: breaker {caller.breaker.state}")
+    # En half-open pasa una sola llamada de prueba; las concurrentes siguen rechazadas
+    latencies, errors = await _run(agent, caller, 20, 1)
+    print(f"recuperado: {len(latencies)} ok, errores {errors or 0}, breaker {caller.breaker.state}")
+    await client.aclose()
+
+
+async def _main(n_calls, concurrency):
+    print(f"servidor falso: {FAST_MS} ms, {TAIL_RATIO:.0%} de requests a {TAIL_MS} ms; "
+          f"{n_calls} llamadas, concurrencia {concurrency}\n")
+    print(f"{'':>10} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+          f"{'hedges':>7} {'retries':>7} {'requests':>8} {'conns':>6} {'wall':>7}")
+    await _phase("sin hedge", ResilientCaller(attempt_timeout=10, max_attempts=1, hedge=False), n_calls, concurrency)
+    await _phase("con hedge", ResilientCaller(attempt_timeout=10, max_attempts=2, hedge=True,
+                                              hedge_min_seconds=0.1), n_calls, concurrency)
+    await _outage()
+
+
+def main():
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    server, port = _start_server()
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_main(n_calls, concurrency))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
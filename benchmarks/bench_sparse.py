@@ -0,0 +1,106 @@
+"""
+EnsembleModel.fit (10 folds) con el one-hot denso vs sparse (CSR).
+
+Replica train.csv 1x, 10x y 100x y entrena el ensamble con
+build_preprocessor(sparse=False) y sparse=True. Cada corrida va en su propio
+proceso; un thread muestrea el RSS y se reporta el pico durante el fit menos
+el RSS con los datos ya cargados, el tiempo de fit, el tamaño de la matriz
+transformada y el RMSE de CV (debe coincidir entre modos salvo redondeo).
+
+LGBM usa n_estimators árboles (default 300) para que 100x termine en un
+tiempo razonable; el resto de los parámetros son los del registro.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_sparse.py [escalas] [n_estimators]
+    python benchmarks/bench_sparse.py 1,10,100 300
+"""
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import psutil
+import scipy.sparse as sp
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "ML", "models", "ensemble_elnet_lgbm"))
+
+warnings.filterwarnings("ignore")
+
+DATA_DIR = os.path.join(ROOT, "data", "housing_data")
+MB = 1024 * 1024
+
+
+class _PeakRSS(threading.Thread):
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.proc = psutil.Process()
+        self.interval = interval
+        self.peak = self.proc.memory_info().rss
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, self.proc.memory_info().rss)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def _matrix_mb(Xt):
+    if sp.issparse(Xt):
+        return (Xt.data.nbytes + Xt.indices.nbytes + Xt.indptr.nbytes) / MB
+    return Xt.nbytes / MB
+
+
+def _run(scale, sparse, n_estimators, results):
+    from utils.utils_yose import load_data, make_features, build_preprocessor
+    from ensemble import EnsembleModel
+
+    train, _ = load_data(DATA_DIR)
+    train = pd.concat([train] * scale, ignore_index=True)
+    y = np.log1p(train["SalePrice"])
+    X = make_features(train.drop(columns=["Id", "SalePrice"]))
+    del train
+    matrix_mb = _matrix_mb(build_preprocessor(X, sparse=sparse).fit_transform(X))
+
+    model = EnsembleModel(42, learners={"elasticnet": {}, "lgbm": {"n_estimators": n_estimators, "verbose": -1}},
+                          early_stopping_rounds=50, sparse=sparse)
+    base = psutil.Process().memory_info().rss
+    sampler = _PeakRSS()
+    sampler.start()
+    t0 = time.perf_counter()
+    model.fit(X, y)
+    fit_s = time.perf_counter() - t0
+    peak = sampler.stop()
+    results.put((len(X), matrix_mb, (peak - base) / MB, fit_s, model.rmse))
+
+
+def main():
+    scales = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1, 10, 100]
+    n_estimators = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    ctx = mp.get_context("spawn")
+
+    print(f"LGBM n_estimators={n_estimators}, 10 folds, 1 proceso por corrida")
+    print(f"{'scale':>6} {'rows':>8} {'mode':>7} {'Xt':>10} {'peak fit':>11} {'fit':>9} {'cv rmse':>9}")
+    for scale in scales:
+        for sparse in (False, True):
+            results = ctx.Queue()
+            p = ctx.Process(target=_run, args=(scale, sparse, n_estimators, results))
+            p.start()
+            rows, matrix_mb, peak_mb, fit_s, rmse = results.get()
+            p.join()
+            mode = "sparse" if sparse else "dense"
+            print(f"{scale:>5}x {rows:>8} {mode:>7} {matrix_mb:>7.1f} MB {peak_mb:>8.1f} MB "
+                  f"{fit_s:>8.1f}s {rmse:>9.5f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
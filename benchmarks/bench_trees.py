@@ -0,0 +1,68 @@
+"""
+Benchmark LGBMRegressor.predict vs el evaluador NumPy de árboles (compiled.TreeEnsemble).
+
+Entrena el LGBM del ensamble sobre train.csv preprocesado, verifica que ambos
+caminos den el mismo resultado y reporta el tiempo por llamada por tamaño de
+batch. El cruce sirve para fijar EnsembleModel.numpy_trees_max_rows.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_trees.py [n_estimators]
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "ML", "models", "ensemble_elnet_lgbm"))
+from utils.utils_yose import load_data, make_features
+from ensemble import _compile_lgbm, _fit_preprocessor, make_learner
+from compiled import TreeEnsemble
+
+warnings.filterwarnings("ignore")
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "housing_data")
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096]
+
+
+def _timeit(fn, X, budget=0.5):
+    fn(X)
+    n, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < budget:
+        fn(X)
+        n += 1
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    n_estimators = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    train, test = load_data(DATA_DIR)
+    X = make_features(train.drop(columns=["Id", "SalePrice"]))
+    X_test = make_features(test.drop(columns=["Id"]))
+    y = np.log1p(train["SalePrice"])
+
+    _, Xt, Xt_test = _fit_preprocessor(X, X_test)
+    model = make_learner("lgbm", 42, n_estimators=n_estimators, verbose=-1).fit(Xt, y)
+    engine = TreeEnsemble.from_dump(_compile_lgbm(model))
+    print(f"trees={engine.n_trees} nodes={len(engine.value)}")
+
+    print(f"{'batch':>6} {'lgbm':>12} {'numpy':>12} {'speedup':>8}")
+    crossover = None
+    for n in BATCH_SIZES:
+        reps = -(-n // len(Xt_test))
+        Xb = np.vstack([Xt_test] * reps)[:n]
+        assert np.max(np.abs(model.predict(Xb) - engine.predict(Xb))) <= 1e-12
+
+        t_ref = _timeit(model.predict, Xb)
+        t_new = _timeit(engine.predict, Xb)
+        if t_new > t_ref and crossover is None:
+            crossover = n
+        print(f"{n:>6} {t_ref * 1e3:>9.2f} ms {t_new * 1e3:>9.2f} ms {t_ref / t_new:>7.1f}x")
+
+    print(f"LightGBM wins from batch size {crossover}" if crossover else "NumPy wins at every size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import asyncio
+import bisect
+import threading
+
+from inference import PoolFullError
+
+
+class MicroBatcher:
+    """
+    Dynamic batcher for single-house predictions.
+
+    Concurrent submit() calls are collected for up to ``max_wait_ms`` or until
+    ``max_batch`` rows are pending, then ``predict_fn`` runs once over the
+    stacked rows (on ``run_fn``, the inference pool) and each caller gets its
+    own result back. If a batch fails its rows are retried one by one, so only
+    the request with the bad row gets the error; a full inference queue
+    (PoolFullError) goes to every caller as is, since retrying would only add
+    load. A batch-size histogram is kept for /api/metrics.
+    """
+
+    def __init__(self, predict_fn, run_fn, max_batch=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn  # list of rows -> array of results (same order)
+        self.run_fn = run_fn          # async (fn, *args) -> result
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._pending = []
+        self._timer = None
+        # The loop only keeps weak references to tasks: hold them until they finish
+        self._tasks = set()
+
+        # Histogram buckets: 1, 2, 4, ... up to max_batch
+        self.buckets = [1]
+        while self.buckets[-1] < self.max_batch:
+            self.buckets.append(min(self.buckets[-1] * 2, self.max_batch))
+        self._hist = [0] * len(self.buckets)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.split_batches = 0
+
+    async def submit(self, row):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((row, fut))
+
+        if len(self._pending) >= self.max_batch or self.max_wait == 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            items = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            task = asyncio.get_running_loop().create_task(self._run_batch(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, items):
+        # Callers that already gave up (client disconnect) don't need a row in the batch
+        items = [(row, fut) for row, fut in items if not fut.done()]
+        if not items:
+            return
+        self._record(len(items))
+        await self._predict(items)
+
+    async def _predict(self, items):
+        try:
+            results = await self.run_fn(self.predict_fn, [row for row, _ in items])
+        except asyncio.CancelledError:
+            for _, fut in items:
+                fut.cancel()
+            raise
+        except PoolFullError as e:
+            for _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        except Exception as e:
+            if len(items) == 1:
+                if not items[0][1].done():
+                    items[0][1].set_exception(e)
+                return
+            with self._lock:
+                self.split_batches += 1
+            await asyncio.gather(*(self._predict([item]) for item in items if not item[1].done()))
+            return
+
+        for (_, fut), result in zip(items, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    def _record(self, size):
+        with self._lock:
+            self._hist[bisect.bisect_left(self.buckets, size)] += 1
+            self.batches += 1
+            self.rows += size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "rows": self.rows,
+                "split_batches": self.split_batches,
+                "batch_size_hist": {
+                    f"le_{b}": n for b, n in zip(self.buckets, self._hist)
+                },
+            }
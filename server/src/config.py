@@ -29,4 +29,4 @@ def setup_logging():
     _logger.addHandler(handler)
     _logger.propagate = False
 
-    return _logger
\ No newline at end of file
+    return _logger
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolFullError(Exception):
+    pass
+
+
+class InferencePool:
+    """
+    Bounded thread pool for the CPU-bound feature + predict stage.
+
+    Keeps pandas/sklearn/LightGBM work off the asyncio event loop so LLM I/O
+    and /health keep flowing while predictions run. NumPy, pandas and LightGBM
+    release the GIL in their hot loops, so throughput scales with workers up
+    to the core count.
+    """
+
+    def __init__(self, max_workers, max_queue=0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue  # 0 = unbounded
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+
+    def _on_done(self, fut):
+        # A task cancelled before it started never reaches _task, release its queue slot here
+        if fut.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def _task(self, fn, args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue:
+                raise PoolFullError(f"Inference queue full ({self.queued} waiting)")
+            self.queued += 1
+
+        fut = self._executor.submit(self._task, fn, args)
+        fut.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(fut)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
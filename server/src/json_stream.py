@@ -0,0 +1,143 @@
+import json
+
+_WS = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """
+    Incremental parser for the flat JSON object the LLM streams back.
+
+    feed() takes the next text delta and returns the (key, value) pairs that
+    became complete with it. Anything before the first '{' (e.g. a markdown
+    fence) is skipped. Scalars are only emitted once a delimiter arrives,
+    since "12" may still turn into "123". Malformed text stops the parser
+    (``error`` is set) without losing the pairs completed before it.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.state = "start"  # start -> key -> colon -> value -> comma -> ... -> done
+        self.key = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    def feed(self, text):
+        self.buf += text
+        out = []
+        while self.state not in ("done", "error"):
+            try:
+                step = self._step()
+            except ValueError as e:
+                self.error = e
+                self.state = "error"
+                break
+            if step is None:
+                break
+            if step is not True:
+                out.append(step)
+        return out
+
+    def _skip_ws(self):
+        while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+            self.pos += 1
+        return self.pos < len(self.buf)
+
+    def _scan_string(self, start):
+        # Index just past the closing quote of the string starting at start, or None
+        i = start + 1
+        while i < len(self.buf):
+            c = self.buf[i]
+            if c == "\\":
+                i += 2
+                continue
+            if c == '"':
+                return i + 1
+            i += 1
+        return None
+
+    def _scan_value(self, start):
+        c = self.buf[start]
+        if c == '"':
+            return self._scan_string(start)
+        if c in "{[":
+            depth, i = 0, start
+            while i < len(self.buf):
+                c = self.buf[i]
+                if c == '"':
+                    end = self._scan_string(i)
+                    if end is None:
+                        return None
+                    i = end
+                    continue
+                if c in "{[":
+                    depth += 1
+                elif c in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        return i + 1
+                i += 1
+            return None
+        i = start
+        while i < len(self.buf) and self.buf[i] not in ",}" + _WS:
+            i += 1
+        return i if i < len(self.buf) else None
+
+    def _step(self):
+        """Advance one token. Returns a (key, value) pair, True, or None if more input is needed."""
+        if self.state == "start":
+            brace = self.buf.find("{", self.pos)
+            if brace < 0:
+                self.pos = len(self.buf)
+                return None
+            self.pos = brace + 1
+            self.state = "key"
+            return True
+
+        if not self._skip_ws():
+            return None
+        c = self.buf[self.pos]
+
+        if self.state == "key":
+            if c == "}":
+                self.pos += 1
+                self.state = "done"
+                return True
+            if c != '"':
+                raise ValueError(f"Expected key at {self.pos}: {self.buf[self.pos:self.pos + 20]!r}")
+            end = self._scan_string(self.pos)
+            if end is None:
+                return None
+            self.key = json.loads(self.buf[self.pos:end])
+            self.pos = end
+            self.state = "colon"
+            return True
+
+        if self.state == "colon":
+            if c != ":":
+                raise ValueError(f"Expected ':' at {self.pos}")
+            self.pos += 1
+            self.state = "value"
+            return True
+
+        if self.state == "value":
+            end = self._scan_value(self.pos)
+            if end is None:
+                return None
+            value = json.loads(self.buf[self.pos:end])
+            self.pos = end
+            self.state = "comma"
+            return (self.key, value)
+
+        # state == "comma"
+        self.pos += 1
+        if c == ",":
+            self.state = "key"
+        elif c == "}":
+            self.state = "done"
+        else:
+            raise ValueError(f"Expected ',' or '}}' at {self.pos - 1}")
+        return True
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class CompletionCache:
+    """
+    Persistent SQLite cache of LLM completions.
+
+    The key is the normalized prompt + model name + a hash of the system
+    prompt, so editing HOUSE_COMPLETION_PROMPT or switching models never
+    serves stale completions. WAL mode lets several uvicorn workers share
+    the same file. Expired rows are deleted at startup and on every put, so
+    the file stays bounded by what was written within one TTL.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._pid = None
+        self._conn = None
+        self.purged = 0
+        self._purge()
+        self._connection().commit()
+
+    def _connection(self):
+        # A SQLite connection must not cross a fork: each worker process opens its own
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY, output TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS completions_created_at ON completions (created_at)")
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def normalize_prompt(prompt):
+        # Whitespace only: case can carry meaning ("NAmes", "2Story")
+        return " ".join(prompt.split())
+
+    @classmethod
+    def make_key(cls, prompt, model_name, system_prompt):
+        payload = json.dumps(
+            {
+                "prompt": cls.normalize_prompt(prompt),
+                "model": model_name,
+                "system": hashlib.sha256(system_prompt.encode()).hexdigest(),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT output, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and row[1] + self.ttl < time.time()):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, output):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, output, created_at) VALUES (?, ?, ?)",
+                (key, output, time.time()),
+            )
+            self._purge()
+            conn.commit()
+
+    def _purge(self):
+        # Caller commits; uses the created_at index, so it's cheap on every put
+        if not self.ttl:
+            return
+        cur = self._connection().execute(
+            "DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        self.purged += cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._connection().execute("SELECT COUNT(*) FROM completions").fetchone()
+            return {"entries": entries, "hits": self.hits, "misses": self.misses, "purged": self.purged}
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one upstream call.
+
+    The call runs as its own task, so a caller that disconnects does not
+    cancel the request the others are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.joined = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.joined += 1
+        return await asyncio.shield(task)
+
+    def join(self, key):
+        """The in-flight call for ``key``, or None; never starts one"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.joined += 1
+        return task
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self):
+        return {"inflight": len(self._inflight), "calls": self.calls, "joined": self.joined}
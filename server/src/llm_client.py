@@ -0,0 +1,270 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import httpx
+
+# Latencias exitosas necesarias antes de hedgear (el p95 de unas pocas es ruido)
+_MIN_HEDGE_SAMPLES = 20
+
+
+def make_http_client(timeout=20.0, connect_timeout=5.0, max_connections=20, keepalive=10,
+                     keepalive_expiry=30.0):
+    """
+    Pool HTTP async compartido para el proveedor del LLM: conexiones acotadas,
+    keep-alive de las inactivas para que las llamadas seguidas no repitan el
+    handshake TLS y timeouts explícitos en vez de los del SDK.
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+
+
+def make_groq_model(model_name, http_client, api_key=None):
+    """GroqModel sobre ``http_client``, sin los reintentos del SDK (reintenta ResilientCaller)."""
+    from groq import AsyncGroq
+    from pydantic_ai.models.groq import GroqModel
+    from pydantic_ai.providers.groq import GroqProvider
+
+    client = AsyncGroq(api_key=api_key, http_client=http_client, max_retries=0)
+    return GroqModel(model_name, provider=GroqProvider(groq_client=client))
+
+
+def is_upstream_failure(exc):
+    """
+    Timeouts, errores de conexión y 5xx: fallas del proveedor, las únicas que se
+    reintentan y cuentan para el breaker. Un 4xx (request inválida, auth, rate
+    limit) o un error propio se repetiría igual y no dice nada de upstream.
+    """
+    from groq import APIConnectionError
+    from pydantic_ai.exceptions import ModelAPIError
+
+    if isinstance(exc, (TimeoutError, httpx.TimeoutException, httpx.TransportError, APIConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)  # ModelHTTPError, groq.APIStatusError
+    if isinstance(status, int):
+        return status >= 500
+    # Sin status: pydantic-ai envuelve así los errores de conexión/transporte y el error que
+    # el proveedor manda a mitad de un stream
+    return isinstance(exc, ModelAPIError)
+
+
+class CircuitOpenError(Exception):
+    """Se lanza sin llamar a upstream mientras el circuit breaker está abierto."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por fallas consecutivas.
+
+    Cerrado: las llamadas pasan. Tras ``failure_threshold`` fallas seguidas se
+    abre y rechaza llamadas durante ``reset_seconds``; después deja pasar una
+    llamada de prueba (half-open): si sale bien se cierra, si falla vuelve a
+    abrirse. ``failure_threshold=0`` lo desactiva.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self):
+        # La llamada de prueba terminó sin veredicto (se canceló): que pruebe otra
+        self._trial = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial = False
+        if not self.failure_threshold:
+            return
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+
+class LatencyWindow:
+    """Latencias de los últimos ``size`` intentos exitosos."""
+
+    def __init__(self, size=200):
+        self._values = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, seconds):
+        self._values.append(seconds)
+
+    def quantile(self, q):
+        if not self._values:
+            return None
+        values = sorted(self._values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ResilientCaller:
+    """
+    Corre una corrutina de upstream con deadline por intento, un segundo
+    intento opcional (hedge) y circuit breaker.
+
+    Si el primer intento sigue corriendo pasado el p95 de las latencias
+    exitosas recientes (nunca antes de ``hedge_min_seconds``) se lanza un
+    intento idéntico y gana el que termine primero; el otro se cancela. Un
+    intento fallido o vencido se reintenta mientras ``max_attempts`` lo permita,
+    sólo si es una falla de upstream (is_upstream_failure); un 4xx se devuelve
+    enseguida. Cada llamada cuenta una sola vez para el breaker, con los
+    intentos que sea, y sólo las fallas de upstream la abren.
+    """
+
+    def __init__(self, attempt_timeout=20.0, max_attempts=2, hedge=True, hedge_quantile=0.95,
+                 hedge_min_seconds=1.0, breaker=None):
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyWindow()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self):
+        if not self.hedge or self.max_attempts < 2 or len(self.latencies) < _MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.hedge_min_seconds, self.latencies.quantile(self.hedge_quantile))
+
+    async def call(self, fn):
+        """``await fn()`` con la política de arriba; ``fn`` tiene que empezar una request nueva cada vez."""
+        async with self.guard():
+            return await self._race(fn)
+
+    @asynccontextmanager
+    async def guard(self):
+        """
+        Sólo breaker y contadores, para llamadas que no se pueden reintentar ni
+        hedgear (un stream cuyos deltas ya se mandaron); los timeouts de httpx
+        siguen valiendo. Una falla de upstream dentro del bloque (is_upstream_failure)
+        cuenta para el breaker: adentro va sólo la llamada, no el procesamiento de
+        su salida.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"LLM circuit open after {self.breaker.failures} consecutive failures")
+        self.calls += 1
+        try:
+            yield
+        except Exception as e:
+            self.failures += 1
+            if is_upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                # Upstream respondió (4xx) o el error es nuestro: sin veredicto
+                self.breaker.release()
+            raise
+        except BaseException:
+            # Cancelado o el cliente se fue: sin veredicto sobre upstream
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+    async def _attempt(self, fn):
+        t0 = time.monotonic()
+        result = await asyncio.wait_for(fn(), self.attempt_timeout)
+        self.latencies.add(time.monotonic() - t0)
+        return result
+
+    async def _race(self, fn):
+        attempts = []
+        hedged = set()
+        pending = set()
+        last_error = None
+        delay = self.hedge_delay()
+
+        def start():
+            task = asyncio.ensure_future(self._attempt(fn))
+            attempts.append(task)
+            pending.add(task)
+
+        start()
+        try:
+            while pending:
+                can_hedge = delay is not None and len(attempts) < self.max_attempts
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Más lento que el p95: compite una request idéntica
+                    self.hedges += 1
+                    start()
+                    hedged.add(attempts[-1])
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        if task in hedged:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    if not is_upstream_failure(last_error):
+                        raise last_error  # reintentar un 4xx daría lo mismo
+                if not pending and len(attempts) < self.max_attempts:
+                    self.retries += 1
+                    start()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        p50 = self.latencies.quantile(0.5)
+        p95 = self.latencies.quantile(0.95)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_seconds": self.hedge_delay(),
+            "latency_p50_seconds": p50,
+            "latency_p95_seconds": p95,
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "opens": self.breaker.opens,
+                "rejected": self.breaker.rejected,
+            },
+        }
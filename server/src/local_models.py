@@ -0,0 +1,81 @@
+import glob
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+from config import setup_logging
+
+logger = setup_logging()
+
+
+def model_files(models_dir):
+    """Base learner pickles in models_dir, in deterministic (name) order"""
+    return sorted(glob.glob(os.path.join(models_dir, "*.pkl")))
+
+
+def local_version(models_dir):
+    """Version of the local model set: hash of the pickles' and weights.json's size and mtime, or None"""
+    files = model_files(models_dir)
+    if not files:
+        return None
+    weights_path = os.path.join(models_dir, "weights.json")
+    digest = hashlib.sha256()
+    for path in files + ([weights_path] if os.path.exists(weights_path) else []):
+        st = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return f"local-{digest.hexdigest()[:12]}"
+
+
+class LocalEnsemble:
+    """
+    Base learners saved one per file (``<name>.pkl``, a fitted Pipeline that
+    predicts log price) plus ``weights.json``, blended like
+    EnsembleModel.predict: one (n, N) prediction matrix times the weights.
+
+    Weights are aligned with the learners present and renormalized; without
+    weights.json every learner weighs the same.
+    """
+
+    def __init__(self, models, weights):
+        self.models = models  # name -> fitted pipeline
+        self.weights = np.array([weights[name] for name in models], dtype=float)
+
+    @classmethod
+    def load(cls, models_dir):
+        models = {}
+        for path in model_files(models_dir):
+            # The file name is the learner name (lgbm.pkl, catboost.pkl, ...)
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                # mmap_mode: numpy arrays in joblib pickles are mapped, not copied, and
+                # shared between the workers serve.py forks
+                models[name] = joblib.load(path, mmap_mode="r")
+            except Exception as e:
+                logger.warning(f"Could not load {path}: {type(e).__name__}: {e}")
+        if not models:
+            raise FileNotFoundError(f"No loadable *.pkl models in {models_dir}")
+
+        weights = {}
+        weights_path = os.path.join(models_dir, "weights.json")
+        if os.path.exists(weights_path):
+            with open(weights_path) as f:
+                weights = json.load(f)
+            missing = sorted(set(weights) - set(models))
+            if missing:
+                logger.warning(f"Weights without model file, ignored: {missing}")
+        weights = {name: float(weights.get(name, 0.0 if weights else 1.0)) for name in models}
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError(f"Weights for {sorted(models)} sum to {total}")
+        weights = {name: w / total for name, w in weights.items()}
+
+        logger.info(f"Local models loaded from {models_dir}: weights={weights}")
+        return cls(models, weights)
+
+    def predict_matrix(self, X):
+        return np.column_stack([np.asarray(m.predict(X), dtype=float).ravel() for m in self.models.values()])
+
+    def predict(self, X):
+        return self.predict_matrix(X) @ self.weights
@@ -1,10 +1,8 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from dotenv import load_dotenv
 import uvicorn
-import joblib
-import json
-import glob
 import sys
 sys.path.append("../")
 
@@ -19,46 +17,50 @@ load_dotenv()
 logger = setup_logging()
 
 DATA_DIR = os.getenv("DATA_DIR", "data/housing_data/")
-MODELS = []
-WEIGHTS = {}
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "60"))
+
+async def warm_up():
+    # Corre fuera del event loop: /health responde mientras carga, /ready da 503
+    while True:
+        try:
+            await asyncio.to_thread(routes.warm_up_model)
+            logger.info("Modelo listo (warm-up completo)")
+            return
+        except Exception as e:
+            logger.error(f"Warm-up failed: {type(e).__name__}: {e}, retrying in {WARMUP_RETRY_SECONDS}s")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+async def poll_model_alias():
+    # Hot reload: si MODEL_ALIAS se mueve a otra versión, se carga y se intercambia en caliente
+    while True:
+        await asyncio.sleep(MODEL_POLL_SECONDS)
+        try:
+            await asyncio.to_thread(routes.model_holder.refresh)
+        except Exception as e:
+            logger.error(f"Model reload failed: {type(e).__name__}: {e}")
+
+def preload():
+    """Carga el modelo antes del fork (src/serve.py): los workers heredan la memoria copy-on-write"""
+    try:
+        routes.get_cached_model()
+    except Exception as e:
+        # Cada worker reintenta en warm_up()
+        logger.error(f"Preload of serving model failed: {type(e).__name__}: {e}")
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    # Startup
-    try:
-        logger.info("Loading models...")
-        # Load models on startup
-        global MODELS, WEIGHTS
-        models_dir = os.path.join(os.path.dirname(__file__), "models")
-        weights_path = os.path.join(models_dir, "weights.json")
-
-        MODELS = []
-        WEIGHTS = {}
-
-        if os.path.exists(weights_path):
-            with open(weights_path, "r") as f:
-                WEIGHTS.update(json.load(f))
-        else:
-            WEIGHTS.update({"elasticnet": 0.5, "lgbm": 0.5})
-
-        logger.info(f"Model weights loaded: {WEIGHTS}")
-        # Cargar modelos .pkl (orden determinista por nombre)
-        for mf in sorted(glob.glob(os.path.join(models_dir, "*.pkl"))):
-            try:
-                with open(mf, "rb") as fh:
-                    MODELS.append(joblib.load(fh))
-            except Exception as e:
-                print(f"[startup] Warning: no se pudo cargar {mf}: {type(e).__name__}: {e}")
-
-        logger.info("Modelos cargados en startup")
-        print(f"[startup] Modelos cargados={len(MODELS)}, weights={WEIGHTS}")
-
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
-        raise e
+    # Startup: el modelo se carga en warm_up() (o ya vino precargado de serve.py)
+    tasks = [asyncio.create_task(warm_up())]
+    if MODEL_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(poll_model_alias()))
 
     yield
 
+    for task in tasks:
+        task.cancel()
+    routes.inference_pool.shutdown()
+    await routes.llm_http_client.aclose()
     logger.info("Application shutdown")
 
 
@@ -71,7 +73,13 @@ app.include_router(routes.router, prefix="/api")
 def main():
     host = os.getenv("FASTAPI_HOST", "0.0.0.0")
     port = int(os.getenv("FASTAPI_PORT", "8000"))
-    debug = os.getenv("FASTAPI_DEBUG", "true").lower() == "true"
+    debug = os.getenv("FASTAPI_DEBUG", "false").lower() == "true"
+
+    if not debug:
+        # Producción: N workers con el modelo precargado (ver src/serve.py). exec para que
+        # serve.py fije WEB_CONCURRENCY / INFERENCE_WORKERS antes de importar routes
+        serve_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py")
+        os.execv(sys.executable, [sys.executable, serve_py])
 
     uvicorn.run(
         "main:app",
@@ -82,4 +90,4 @@ def main():
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,75 @@
+import threading
+from config import setup_logging
+
+logger = setup_logging()
+
+
+class ModelHolder:
+    """
+    Thread-safe holder for the serving model.
+
+    The first get() loads the model under a lock, so concurrent first requests
+    share a single load. refresh() checks the registry alias and, if it moved,
+    loads and warms the new version off the request path before swapping the
+    reference. Callers take one reference per request with get() (or
+    snapshot() when they also need the version), so in-flight requests finish
+    on the model they started with and the old one is freed once they drop it.
+    """
+
+    def __init__(self, load, resolve_version=None, warmup=None):
+        self._load = load                        # version (or None) -> model
+        self._resolve_version = resolve_version  # () -> current alias version or None
+        self._warmup = warmup                    # model -> None, run before a swap
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        # (model, version) swapped as one reference, so readers never see a mixed pair
+        self._current = (None, None)
+
+    @property
+    def version(self):
+        return self._current[1]
+
+    @property
+    def loaded(self):
+        return self._current[0] is not None
+
+    def get(self):
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        """(model, version) of the serving model, loading it on first use"""
+        current = self._current
+        if current[0] is not None:
+            return current
+
+        with self._lock:
+            if self._current[0] is None:
+                version = self._resolve_version() if self._resolve_version else None
+                self._current = (self._load(version), version)
+            return self._current
+
+    def refresh(self):
+        """Reload if the alias points to a new version. Returns True if it swapped."""
+        if self._resolve_version is None or self._current[0] is None:
+            return False
+
+        version = self._resolve_version()
+        if version is None or version == self.version:
+            return False
+
+        # Only one background reload at a time
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            logger.info(f"Model alias moved {self.version} -> {version}, loading...")
+            model = self._load(version)
+            if self._warmup is not None:
+                self._warmup(model)
+
+            with self._lock:
+                old_version = self.version
+                self._current = (model, version)
+            logger.info(f"Model swapped {old_version} -> {version}")
+            return True
+        finally:
+            self._reload_lock.release()
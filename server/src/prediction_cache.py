@@ -0,0 +1,84 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry cost: 16-byte digest key + float + tuple + OrderedDict node
+_APPROX_ENTRY_BYTES = 200
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of predicted prices.
+
+    Keys are a digest of the normalized feature dict (after
+    validate_and_fix_house_data and normalize_house_data) plus the model
+    version, so a promotion never serves prices from the previous model.
+    Memory is bounded by ``max_entries``; ``max_entries=0`` disables the cache.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._data = OrderedDict()  # key -> (expires_at, price)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(normalized_data, model_version):
+        payload = json.dumps(normalized_data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(f"{model_version}|{payload}".encode(), digest_size=16).digest()
+
+    def get(self, key):
+        if not self.max_entries:
+            return None
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, price = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return price
+
+    def put(self, key, price):
+        if not self.max_entries:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, price)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "approx_bytes": len(self._data) * _APPROX_ENTRY_BYTES,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -1,17 +1,36 @@
 import os
-from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, List, Union
+import asyncio
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional, Union
 import json
+import sys
+import time
 import numpy as np
 import pandas as pd
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from pydantic_ai import Agent
-from pydantic_ai.models.groq import GroqModel
 from dotenv import load_dotenv
 from utils.mlflow_flow import set_tracking
-from utils.utils_yose import make_features
+from utils.feature_plan import ImputationTable, make_features_fast
+from utils.utils_yose import load_imputation_stats
+from utils.resources import available_cpus
 import mlflow
+from mlflow.tracking import MlflowClient
 from config import setup_logging
+from model_holder import ModelHolder
+from inference import InferencePool, PoolFullError
+from batcher import MicroBatcher
+from prediction_cache import PredictionCache
+from llm_cache import CompletionCache, SingleFlight
+from llm_client import CircuitBreaker, CircuitOpenError, ResilientCaller, make_groq_model, make_http_client
+from json_stream import IncrementalObjectParser
+
+# compiled.py/ensemble.py viven sólo en ML/ (los modelos de MLflow se despicklean con `ensemble`)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ML", "models", "ensemble_elnet_lgbm"))
+from compiled import CompiledEnsemble, artifact_version
+from local_models import LocalEnsemble, local_version
 
 # Load environment variables first
 load_dotenv()
@@ -22,26 +41,110 @@ ENDPOINT_URL = os.getenv("MLFLOW_TRACKING_URI")
 MODEL_NAME = os.getenv("MODEL_NAME")
 ALIAS = os.getenv("MODEL_ALIAS")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-# Global model variable for caching
-_cached_model = None
+PREDICT_BATCH_MAX_ROWS = int(os.getenv("PREDICT_BATCH_MAX_ROWS", "50000"))
+# Con varios workers (src/serve.py) cada proceso se queda con su parte de los CPUs
+INFERENCE_WORKERS = int(os.getenv(
+    "INFERENCE_WORKERS", str(max(1, available_cpus() // int(os.getenv("WEB_CONCURRENCY", "1"))))
+))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "256"))
+MICROBATCH_MAX_ROWS = int(os.getenv("MICROBATCH_MAX_ROWS", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "openai/gpt-oss-120b")
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "cache", "llm_completions.sqlite"),
+)
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Upstream LLM: per-attempt deadline, shared keep-alive pool, hedging and circuit breaker (llm_client.py)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "10"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() == "true"
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1.0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+IMPUTATION_PATH = os.getenv(
+    "IMPUTATION_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "models", "imputation.json"),
+)
+# Artefacto de EnsembleModel.export_compiled; si se define, reemplaza al modelo de MLflow
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "")
+# <learner>.pkl + weights.json; si hay algún .pkl, se sirve esto en vez de MLflow
+LOCAL_MODELS_DIR = os.getenv(
+    "LOCAL_MODELS_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "models"),
+)
+
+# True once the model is loaded and has answered a warm-up prediction
+_model_ready = False
 
 router = APIRouter()
 
-def get_cached_model():
-    global _cached_model
+# Feature + predict stage runs here, never on the event loop
+inference_pool = InferencePool(INFERENCE_WORKERS, max_queue=INFERENCE_MAX_QUEUE)
 
-    if _cached_model is not None:
-        return _cached_model
+def load_imputation():
+    # Medianas aprendidas en train.csv (utils_yose.fit_imputation_stats)
+    stats = load_imputation_stats(IMPUTATION_PATH)
+    if stats is None:
+        logger.warning(f"No imputation stats at {IMPUTATION_PATH}, using per-request medians")
+        return None
+    logger.info(f"Imputation stats loaded from {IMPUTATION_PATH}")
+    return ImputationTable(stats)
 
-    logger.info("Loading MLflow model for the first time...")
+_imputation = load_imputation()
+
+def resolve_model_version():
+    """Version the registry alias currently points to, or None if unavailable"""
+    if COMPILED_MODEL_PATH:
+        # El export_id de meta (hash del contenido) hace de versión: re-exportar dispara el hot reload
+        try:
+            return f"compiled-{artifact_version(COMPILED_MODEL_PATH)}"
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not read version of {COMPILED_MODEL_PATH}: {type(e).__name__}: {e}")
+            return None
+    version = local_version(LOCAL_MODELS_DIR) if LOCAL_MODELS_DIR else None
+    if version is not None:
+        return version
+    if not (MODEL_NAME and ALIAS):
+        return None
+    try:
+        set_tracking(ENDPOINT_URL)
+        return MlflowClient().get_model_version_by_alias(MODEL_NAME, ALIAS).version
+    except Exception as e:
+        logger.warning(f"Could not resolve {MODEL_NAME}@{ALIAS}: {type(e).__name__}: {str(e)[:200]}")
+        return None
+
+def load_model(version=None):
+    if COMPILED_MODEL_PATH:
+        m = CompiledEnsemble.load(COMPILED_MODEL_PATH)
+        logger.info(f"Loaded compiled model: {COMPILED_MODEL_PATH} ({version})")
+        return m
+    if LOCAL_MODELS_DIR and local_version(LOCAL_MODELS_DIR) is not None:
+        return LocalEnsemble.load(LOCAL_MODELS_DIR)
+
+    logger.info(f"Loading MLflow model (version={version})...")
     set_tracking(ENDPOINT_URL)
 
     m = None
     load_errors = []
 
+    # Pin the exact version the alias resolved to, so a concurrent promotion can't mix versions
+    if MODEL_NAME and version is not None:
+        try:
+            m = mlflow.pyfunc.load_model(f"models:/{MODEL_NAME}/{version}")
+            logger.info(f"Loaded model version: {MODEL_NAME}/{version}")
+        except Exception as e:
+            err = f"Version: models:/{MODEL_NAME}/{version} -> {type(e).__name__}: {str(e)[:200]}"
+            logger.warning(err)
+            load_errors.append(err)
+
     # Try to load model with same logic as /predict
-    if MODEL_NAME and ALIAS:
+    if m is None and MODEL_NAME and ALIAS:
         try:
             m = mlflow.pyfunc.load_model(f"models:/{MODEL_NAME}@{ALIAS}")
             logger.info(f"Loaded model via alias: {MODEL_NAME}@{ALIAS}")
@@ -63,19 +166,22 @@ def get_cached_model():
         logger.error("Could not load MLflow model")
         raise Exception(f"Failed to load model: {load_errors}")
 
-    _cached_model = m
-    logger.info("Model cached successfully")
-    return _cached_model
+    return m
+
+def get_cached_model():
+    return model_holder.get()
 
 class PropertyValue(BaseModel):
     name: str
     value: Union[str, int, float]
 
 class HouseFeaturesRaw(BaseModel):
+    # Numeric fields may be missing or null (test.csv has NaNs in 313 of 1459 rows):
+    # predict_prices turns them into NaN and they are imputed with the train.csv medians
     MSSubClass: Union[str, int]
     MSZoning: str
-    LotFrontage: Union[int, float]
-    LotArea: Union[int, float]
+    LotFrontage: Optional[Union[int, float]] = None
+    LotArea: Optional[Union[int, float]] = None
     Street: str
     Alley: str
     LotShape: str
@@ -92,10 +198,10 @@ class HouseFeaturesRaw(BaseModel):
     # Building
     BldgType: str
     HouseStyle: str
-    OverallQual: Union[int, float]
-    OverallCond: Union[int, float]
-    YearBuilt: Union[int, float]
-    YearRemodAdd: Union[int, float]
+    OverallQual: Optional[Union[int, float]] = None
+    OverallCond: Optional[Union[int, float]] = None
+    YearBuilt: Optional[Union[int, float]] = None
+    YearRemodAdd: Optional[Union[int, float]] = None
 
     # Exterior
     RoofStyle: str
@@ -103,7 +209,7 @@ class HouseFeaturesRaw(BaseModel):
     Exterior1st: str
     Exterior2nd: str
     MasVnrType: str
-    MasVnrArea: Union[int, float]
+    MasVnrArea: Optional[Union[int, float]] = None
     ExterQual: str
     ExterCond: str
     Foundation: str
@@ -113,11 +219,11 @@ class HouseFeaturesRaw(BaseModel):
     BsmtCond: str
     BsmtExposure: str
     BsmtFinType1: str
-    BsmtFinSF1: Union[int, float]
+    BsmtFinSF1: Optional[Union[int, float]] = None
     BsmtFinType2: str
-    BsmtFinSF2: Union[int, float]
-    BsmtUnfSF: Union[int, float]
-    TotalBsmtSF: Union[int, float]
+    BsmtFinSF2: Optional[Union[int, float]] = None
+    BsmtUnfSF: Optional[Union[int, float]] = None
+    TotalBsmtSF: Optional[Union[int, float]] = None
 
     # Systems
     Heating: str
@@ -126,50 +232,57 @@ class HouseFeaturesRaw(BaseModel):
     Electrical: str
 
     # Interior
-    FirstFlrSF: Union[int, float] = Field(alias="1stFlrSF")
-    SecondFlrSF: Union[int, float] = Field(alias="2ndFlrSF")
-    LowQualFinSF: Union[int, float]
-    GrLivArea: Union[int, float]
-    BsmtFullBath: Union[int, float]
-    BsmtHalfBath: Union[int, float]
-    FullBath: Union[int, float]
-    HalfBath: Union[int, float]
-    BedroomAbvGr: Union[int, float]
-    KitchenAbvGr: Union[int, float]
+    FirstFlrSF: Optional[Union[int, float]] = Field(None, alias="1stFlrSF")
+    SecondFlrSF: Optional[Union[int, float]] = Field(None, alias="2ndFlrSF")
+    LowQualFinSF: Optional[Union[int, float]] = None
+    GrLivArea: Optional[Union[int, float]] = None
+    BsmtFullBath: Optional[Union[int, float]] = None
+    BsmtHalfBath: Optional[Union[int, float]] = None
+    FullBath: Optional[Union[int, float]] = None
+    HalfBath: Optional[Union[int, float]] = None
+    BedroomAbvGr: Optional[Union[int, float]] = None
+    KitchenAbvGr: Optional[Union[int, float]] = None
     KitchenQual: str
-    TotRmsAbvGrd: Union[int, float]
+    TotRmsAbvGrd: Optional[Union[int, float]] = None
     Functional: str
-    Fireplaces: Union[int, float]
+    Fireplaces: Optional[Union[int, float]] = None
     FireplaceQu: str
 
     # Garage
     GarageType: str
-    GarageYrBlt: Union[int, float]
+    GarageYrBlt: Optional[Union[int, float]] = None
     GarageFinish: str
-    GarageCars: Union[int, float]
-    GarageArea: Union[int, float]
+    GarageCars: Optional[Union[int, float]] = None
+    GarageArea: Optional[Union[int, float]] = None
     GarageQual: str
     GarageCond: str
     PavedDrive: str
 
     # Outdoor
-    WoodDeckSF: Union[int, float]
-    OpenPorchSF: Union[int, float]
-    EnclosedPorch: Union[int, float]
-    ThreeSsnPorch: Union[int, float] = Field(alias="3SsnPorch")
-    ScreenPorch: Union[int, float]
-    PoolArea: Union[int, float]
+    WoodDeckSF: Optional[Union[int, float]] = None
+    OpenPorchSF: Optional[Union[int, float]] = None
+    EnclosedPorch: Optional[Union[int, float]] = None
+    ThreeSsnPorch: Optional[Union[int, float]] = Field(None, alias="3SsnPorch")
+    ScreenPorch: Optional[Union[int, float]] = None
+    PoolArea: Optional[Union[int, float]] = None
     PoolQC: str
     Fence: str
     MiscFeature: str
-    MiscVal: Union[int, float]
+    MiscVal: Optional[Union[int, float]] = None
 
     # Sale
-    MoSold: Union[int, float]
-    YrSold: Union[int, float]
+    MoSold: Optional[Union[int, float]] = None
+    YrSold: Optional[Union[int, float]] = None
     SaleType: str
     SaleCondition: str
 
+_house_list_adapter = TypeAdapter(List[HouseFeaturesRaw])
+
+# Raw field names (aliases) the model needs, used to know when a streamed house is complete
+HOUSE_FIELDS = [f.alias or name for name, f in HouseFeaturesRaw.model_fields.items()]
+# Numeric fields (the optional ones): a missing value must reach make_features_fast as NaN
+NUMERIC_FIELDS = [f.alias or name for name, f in HouseFeaturesRaw.model_fields.items() if not f.is_required()]
+
 class HouseProperties(BaseModel):
     properties: List[PropertyValue]
 
@@ -198,7 +311,7 @@ IMPORTANTE:
 - LandSlope: Pendiente del terreno (Gtl,Mod,Sev)
 
 **UBICACIÓN:**
-- Neighborhood: Vecindario (Blmngtn,Blueste,BrDale,BrkSide,ClearCr,CollgCr,Crawfor,Edwards,Gilbert,IDOTRR,MeadowV,Mitchel,Names,NoRidge,NPkVill,NridgHt,NWAmes,OldTown,SWISU,Sawyer,SawyerW,Somerst,StoneBr,Timber,Veenker)
+- Neighborhood: Vecindario (Blmngtn,Blueste,BrDale,BrkSide,ClearCr,CollgCr,Crawfor,Edwards,Gilbert,IDOTRR,MeadowV,Mitchel,NAmes,NoRidge,NPkVill,NridgHt,NWAmes,OldTown,SWISU,Sawyer,SawyerW,Somerst,StoneBr,Timber,Veenker)
 - Condition1: Condición proximidad 1 (Artery,Feedr,Norm,RRNn,RRAn,PosN,PosA,RRNe,RRAe)
 - Condition2: Condición proximidad 2 (Artery,Feedr,Norm,RRNn,RRAn,PosN,PosA,RRNe,RRAe)
 
@@ -394,7 +507,7 @@ VALID_CATEGORIES = {
     "Utilities": ["AllPub","NoSewr","NoSeWa","ELO"],
     "LotConfig": ["Inside","Corner","CulDSac","FR2","FR3"],
     "LandSlope": ["Gtl","Mod","Sev"],
-    "Neighborhood": ["Blmngtn","Blueste","BrDale","BrkSide","ClearCr","CollgCr","Crawfor","Edwards","Gilbert","IDOTRR","MeadowV","Mitchel","Names","NoRidge","NPkVill","NridgHt","NWAmes","OldTown","SWISU","Sawyer","SawyerW","Somerst","StoneBr","Timber","Veenker"],
+    "Neighborhood": ["Blmngtn","Blueste","BrDale","BrkSide","ClearCr","CollgCr","Crawfor","Edwards","Gilbert","IDOTRR","MeadowV","Mitchel","NAmes","NoRidge","NPkVill","NridgHt","NWAmes","OldTown","SWISU","Sawyer","SawyerW","Somerst","StoneBr","Timber","Veenker"],
     "Condition1": ["Artery","Feedr","Norm","RRNn","RRAn","PosN","PosA","RRNe","RRAe"],
     "Condition2": ["Artery","Feedr","Norm","RRNn","RRAn","PosN","PosA","RRNe","RRAe"],
     "BldgType": ["1Fam","2FmCon","Duplx","TwnhsE","TwnhsI"],
@@ -473,14 +586,387 @@ def validate_and_fix_house_data(house_data):
 
     return fixed_data
 
-# Initialize Groq model and agent with JSON string output (more reliable)
-groq_model = GroqModel("openai/gpt-oss-120b")
+# Define columns that should be float (based on working test data)
+FLOAT_COLUMNS = {
+    'LotFrontage', 'MasVnrArea', 'BsmtFinSF1', 'BsmtFinSF2', 'BsmtUnfSF',
+    'TotalBsmtSF', 'BsmtFullBath', 'BsmtHalfBath', 'GarageYrBlt',
+    'GarageCars', 'GarageArea'
+}
+
+def normalize_house_data(house_data):
+    """Normalize NA strings and numeric types the way the model was trained"""
+    normalized_data = {}
+
+    for key, value in house_data.items():
+        # Convert string representations of None/NA to actual None
+        if isinstance(value, str) and value.upper() in ['NA', 'NONE', 'NULL', 'N/A']:
+            normalized_data[key] = None
+        elif isinstance(value, str) and value.strip() == '':
+            normalized_data[key] = None
+        # Force specific columns to be float (critical for MLflow compatibility)
+        elif key in FLOAT_COLUMNS and value is not None:
+            try:
+                normalized_data[key] = float(value)
+            except (ValueError, TypeError):
+                normalized_data[key] = 0.0
+        # Keep other numeric values as native Python types
+        elif isinstance(value, (int, float)) and key not in FLOAT_COLUMNS:
+            try:
+                normalized_data[key] = int(value) if isinstance(value, int) or value.is_integer() else value
+            except (ValueError, TypeError, AttributeError):
+                normalized_data[key] = value
+        else:
+            normalized_data[key] = value
+
+    return normalized_data
+
+def predict_prices(records, model=None):
+    """Run the compiled feature plan and the cached model once over all normalized records"""
+    # One model reference for the whole call, even if a hot reload swaps it meanwhile
+    m = model if model is not None else get_cached_model()
+
+    # One DataFrame for the whole batch (same columns as /predict)
+    df_in = pd.DataFrame.from_records(records)
+    # A column that is None in every row (always the case for a missing field in a
+    # one-row request) comes out as object; as float NaN it is imputed like in a batch
+    num_cols = [c for c in NUMERIC_FIELDS if c in df_in and df_in[c].dtype == object]
+    if num_cols:
+        df_in[num_cols] = df_in[num_cols].apply(pd.to_numeric, errors="coerce").astype(float)
+    fe_df = make_features_fast(df_in, _imputation)
+
+    raw = m.predict(fe_df)
+    return np.expm1(np.asarray(raw, dtype=float).ravel())
+
+def predict_pinned(items):
+    """predict_prices over (model, row) pairs, each row on the model it was submitted with"""
+    prices = np.empty(len(items))
+    groups = {}
+    for i, (model, _) in enumerate(items):
+        groups.setdefault(id(model), (model, []))[1].append(i)
+    # Normally one group; two only for a batch that straddles a hot swap
+    for model, idx in groups.values():
+        prices[idx] = predict_prices([items[i][1] for i in idx], model=model)
+    return prices
+
+def score_records(records):
+    """Validate, normalize and price raw house records (runs on the inference pool)"""
+    rows = [normalize_house_data(validate_and_fix_house_data(r)) for r in records]
+    return predict_prices(rows)
+
+def queue_full_error(e):
+    logger.warning(str(e))
+    return HTTPException(status_code=503, detail="Inference queue full, retry later")
+
+async def run_inference(fn, *args):
+    try:
+        return await inference_pool.run(fn, *args)
+    except PoolFullError as e:
+        raise queue_full_error(e)
+
+async def run_pooled(fn, *args):
+    # Micro-batcher run_fn: PoolFullError has to reach it untranslated (it doesn't split on it)
+    return await inference_pool.run(fn, *args)
+
+# Batched rows are only independent of each other with fitted imputation stats;
+# without them fill_domain_na would take medians across the whole micro-batch
+if _imputation is None and MICROBATCH_MAX_ROWS > 1:
+    logger.warning("Micro-batching disabled: no imputation stats loaded")
+predict_batcher = MicroBatcher(
+    predict_pinned,
+    run_pooled,
+    max_batch=MICROBATCH_MAX_ROWS if _imputation is not None else 1,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+)
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS)
+
+async def predict_one(normalized_data):
+    """Price one normalized house: result cache first, then the micro-batcher"""
+    # Key and prediction from the same (model, version): a hot swap in between
+    # can't store the new model's price under the old version
+    if model_holder.loaded:
+        model, version = model_holder.snapshot()
+    else:
+        model, version = await asyncio.to_thread(model_holder.snapshot)
+    key = prediction_cache.make_key(normalized_data, version)
+    price = prediction_cache.get(key)
+    if price is not None:
+        return price
+
+    try:
+        price = float(await predict_batcher.submit((model, normalized_data)))
+    except PoolFullError as e:
+        raise queue_full_error(e)
+    prediction_cache.put(key, price)
+    return price
+
+def example_house():
+    """The 80-field example from HOUSE_COMPLETION_PROMPT, used for warm-up"""
+    start = HOUSE_COMPLETION_PROMPT.index("{")
+    end = HOUSE_COMPLETION_PROMPT.index("}", start) + 1
+    return json.loads(HOUSE_COMPLETION_PROMPT[start:end])
+
+def warm_up_model(n_runs=3):
+    """Load the model and run dummy predictions so the first request is steady-state"""
+    global _model_ready
+
+    sample = normalize_house_data(validate_and_fix_house_data(example_house()))
+    t0 = time.perf_counter()
+    get_cached_model()
+    logger.info(f"Model loaded in {time.perf_counter() - t0:.2f}s")
+
+    for _ in range(n_runs):
+        t0 = time.perf_counter()
+        predict_prices([sample])
+        logger.info(f"Warm-up prediction in {(time.perf_counter() - t0) * 1e3:.1f}ms")
+
+    _model_ready = True
+
+def _warm_up_candidate(model):
+    # Runs on a freshly loaded version before it is swapped in
+    sample = normalize_house_data(validate_and_fix_house_data(example_house()))
+    predict_prices([sample], model=model)
+
+model_holder = ModelHolder(load_model, resolve_model_version, warmup=_warm_up_candidate)
+
+def parse_batch_body(body, content_type=""):
+    """Parse a JSON array or NDJSON body into a list of validated house records"""
+    try:
+        if "ndjson" in content_type or not body.lstrip().startswith(b"["):
+            houses = [
+                HouseFeaturesRaw.model_validate_json(line)
+                for line in body.splitlines()
+                if line.strip()
+            ]
+        else:
+            houses = _house_list_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+    return [h.model_dump(by_alias=True) for h in houses]
+
+# Initialize Groq model and agent with JSON string output (more reliable).
+# No connection is opened at import, so the pool is safe to create before serve.py forks
+llm_http_client = make_http_client(
+    timeout=LLM_TIMEOUT_SECONDS,
+    connect_timeout=LLM_CONNECT_TIMEOUT_SECONDS,
+    max_connections=LLM_MAX_CONNECTIONS,
+    keepalive=LLM_KEEPALIVE_CONNECTIONS,
+)
+groq_model = make_groq_model(LLM_MODEL_NAME, llm_http_client, api_key=GROQ_API_KEY)
 house_agent = Agent(groq_model, system_prompt=HOUSE_COMPLETION_PROMPT)
+llm_caller = ResilientCaller(
+    attempt_timeout=LLM_TIMEOUT_SECONDS,
+    max_attempts=LLM_MAX_ATTEMPTS,
+    hedge=LLM_HEDGE,
+    hedge_min_seconds=LLM_HEDGE_MIN_SECONDS,
+    breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS),
+)
+
+# Completed houses per prompt; empty LLM_CACHE_PATH disables persistence
+completion_cache = CompletionCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS) if LLM_CACHE_PATH else None
+llm_singleflight = SingleFlight()
+
+async def complete_house(prompt):
+    """LLM completion for a prompt: persistent cache, then one shared upstream call per prompt"""
+    key = CompletionCache.make_key(prompt, LLM_MODEL_NAME, HOUSE_COMPLETION_PROMPT)
+
+    if completion_cache is not None:
+        cached = await asyncio.to_thread(completion_cache.get, key)
+        if cached is not None:
+            return cached
+
+    async def call():
+        result = await llm_caller.call(lambda: house_agent.run(prompt))
+        output = result.output.strip()
+        # Only cache completions we can actually parse
+        if completion_cache is not None:
+            try:
+                json.loads(output)
+            except json.JSONDecodeError:
+                return output
+            await asyncio.to_thread(completion_cache.put, key, output)
+        return output
+
+    return await llm_singleflight.do(key, call)
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
 
+@router.get("/ready")
+def ready():
+    if not _model_ready:
+        raise HTTPException(status_code=503, detail="Model warming up")
+    return {"status": "ready", "model_version": model_holder.version}
+
+@router.get("/metrics")
+def metrics():
+    return {
+        "inference": inference_pool.stats(),
+        "microbatch": predict_batcher.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "llm_cache": completion_cache.stats() if completion_cache is not None else None,
+        "llm_singleflight": llm_singleflight.stats(),
+        "llm_client": llm_caller.stats(),
+    }
+
+@router.post("/predict")
+async def predict(house: HouseFeaturesRaw):
+    # Direct scoring: the caller already has all 80 fields, no LLM round-trip
+    house_data = validate_and_fix_house_data(house.model_dump(by_alias=True))
+    normalized_data = normalize_house_data(house_data)
+
+    try:
+        price = await predict_one(normalized_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Prediction error: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en prediction: {type(e).__name__}: {str(e)[:200]}")
+
+    return {"price": price}
+
+@router.post("/predict/batch")
+async def predict_batch(request: Request):
+    body = await request.body()
+    records = parse_batch_body(body, request.headers.get("content-type", ""))
+
+    if not records:
+        raise HTTPException(status_code=400, detail="At least one house is required")
+    if len(records) > PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(records)} > {PREDICT_BATCH_MAX_ROWS} rows",
+        )
+
+    try:
+        prices = await run_inference(score_records, records)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en batch prediction: {type(e).__name__}: {str(e)[:200]}")
+
+    logger.info(f"Batch prediction successful: {len(records)} rows")
+    return {"count": len(records), "prices": prices.tolist()}
+
+def _ndjson(event):
+    return json.dumps(event, default=str) + "\n"
+
+async def stream_house_events(prompt):
+    """
+    NDJSON events for /llm/stream: one "property" per completed field as the
+    LLM streams, "price" as soon as all HOUSE_FIELDS are in (prediction starts
+    while the LLM is still closing the object) and a final "done" with the
+    same payload as /llm.
+    """
+    key = CompletionCache.make_key(prompt, LLM_MODEL_NAME, HOUSE_COMPLETION_PROMPT)
+    cached = await asyncio.to_thread(completion_cache.get, key) if completion_cache is not None else None
+
+    parser = IncrementalObjectParser()
+    house_data = {}
+    normalized_data = {}
+    price_task = None
+    price_sent = False
+    chunks = []
+
+    def take(pairs):
+        nonlocal price_task
+        events = []
+        for name, value in pairs:
+            # Fix/normalize field by field so only predict is left once the house is complete
+            fixed = validate_and_fix_house_data({name: value})
+            house_data.update(fixed)
+            normalized_data.update(normalize_house_data(fixed))
+            events.append({"event": "property", "name": name, "value": fixed[name]})
+        if price_task is None and all(f in house_data for f in HOUSE_FIELDS):
+            price_task = asyncio.create_task(predict_one(dict(normalized_data)))
+        return events
+
+    def feed(text):
+        # Malformed text only stops the incremental events; the full parse below still runs
+        had_error = parser.error is not None
+        events = take(parser.feed(text))
+        if parser.error is not None and not had_error:
+            logger.warning(f"Incremental JSON parse stopped: {parser.error}")
+        return events
+
+    async def price_of(task):
+        # Same as /llm: a failed prediction is price 0, a full inference queue is an error
+        try:
+            return await task
+        except HTTPException:
+            raise
+        except Exception as pred_error:
+            logger.error(f"Prediction error: {pred_error}")
+            return 0
+
+    try:
+        inflight = llm_singleflight.join(key) if cached is None else None
+        if cached is not None or inflight is not None:
+            # Cached, or /llm is already completing this prompt: no upstream call of our own
+            output = cached if cached is not None else await asyncio.shield(inflight)
+            for event in feed(output):
+                yield _ndjson(event)
+        else:
+            # Only run_stream/stream_text errors reach the guard (and the breaker): an error
+            # handling a delta (parse, validate, predict) stops the stream and is raised after it
+            processing_error = None
+            async with llm_caller.guard(), house_agent.run_stream(prompt) as result:
+                async for delta in result.stream_text(delta=True, debounce_by=None):
+                    try:
+                        chunks.append(delta)
+                        for event in feed(delta):
+                            yield _ndjson(event)
+                        if price_task is not None and price_task.done() and not price_sent:
+                            price_sent = True
+                            yield _ndjson({"event": "price", "price": await price_of(price_task)})
+                    except Exception as e:
+                        processing_error = e
+                        break
+            if processing_error is not None:
+                raise processing_error
+            output = "".join(chunks).strip()
+
+        try:
+            full = json.loads(output)
+        except json.JSONDecodeError:
+            full = None
+        if full is not None and cached is None and inflight is None and completion_cache is not None:
+            await asyncio.to_thread(completion_cache.put, key, output)
+        # Fields the incremental parser didn't reach (it stops at malformed text)
+        if isinstance(full, dict):
+            for event in take((k, v) for k, v in full.items() if k not in house_data):
+                yield _ndjson(event)
+
+        if price_task is None:
+            # Incomplete house: predict with what we have, as /llm does
+            price_task = asyncio.create_task(predict_one(dict(normalized_data)))
+        price = await price_of(price_task)
+        if not price_sent:
+            yield _ndjson({"event": "price", "price": price})
+
+        properties = [{"name": key, "value": value} for key, value in house_data.items()]
+        yield _ndjson({"event": "done", "price": price, "properties": properties})
+
+    except Exception as e:
+        logger.error(f"LLM stream error: {type(e).__name__}: {str(e)}")
+        yield _ndjson({"event": "error", "detail": f"Error en LLM stream: {type(e).__name__}: {str(e)[:200]}"})
+    finally:
+        if price_task is not None and not price_task.done():
+            price_task.cancel()
+
+@router.post("/llm/stream")
+async def llm_stream(data: Dict[str, str] = Body(...)):
+    prompt = data.get("prompt")
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Prompt is required")
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
+
+    return StreamingResponse(stream_house_events(prompt), media_type="application/x-ndjson")
+
 @router.post("/llm")
 async def llm_query(data: Dict[str, str] = Body(...)):
     try:
@@ -492,8 +978,7 @@ async def llm_query(data: Dict[str, str] = Body(...)):
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
 
         # Use the house agent to complete all properties with JSON output
-        result = await house_agent.run(prompt)
-        llm_response = result.output.strip()
+        llm_response = await complete_house(prompt)
 
         # Parse JSON response from LLM
         try:
@@ -504,58 +989,18 @@ async def llm_query(data: Dict[str, str] = Body(...)):
 
         # Validate and fix categorical values
         house_data = validate_and_fix_house_data(house_data)
-        normalized_data = {}
-
-        # Define columns that should be float (based on working test data)
-        float_columns = {
-            'LotFrontage', 'MasVnrArea', 'BsmtFinSF1', 'BsmtFinSF2', 'BsmtUnfSF',
-            'TotalBsmtSF', 'BsmtFullBath', 'BsmtHalfBath', 'GarageYrBlt',
-            'GarageCars', 'GarageArea'
-        }
-
-        for key, value in house_data.items():
-            # Convert string representations of None/NA to actual None
-            if isinstance(value, str) and value.upper() in ['NA', 'NONE', 'NULL', 'N/A']:
-                normalized_data[key] = None
-            elif isinstance(value, str) and value.strip() == '':
-                normalized_data[key] = None
-            # Force specific columns to be float (critical for MLflow compatibility)
-            elif key in float_columns and value is not None:
-                try:
-                    normalized_data[key] = float(value)
-                except (ValueError, TypeError):
-                    normalized_data[key] = 0.0
-            # Keep other numeric values as native Python types
-            elif isinstance(value, (int, float)) and key not in float_columns:
-                try:
-                    normalized_data[key] = int(value) if isinstance(value, int) or value.is_integer() else value
-                except (ValueError, TypeError, AttributeError):
-                    normalized_data[key] = value
-            else:
-                normalized_data[key] = value
+        normalized_data = normalize_house_data(house_data)
 
         logger.info(f"Normalized data types sample: {[(k, type(v).__name__, v) for k, v in list(normalized_data.items())[:5]]}")
 
         # Use cached model for much faster predictions
         try:
-            # Get cached model (loads only once)
-            m = get_cached_model()
-
-            # Create DataFrame (same as /predict)
-            df_in = pd.DataFrame([normalized_data])
-            logger.info(f"Input DataFrame shape: {df_in.shape}")
-
-            # Apply feature engineering (same as /predict)
-            fe_df = make_features(df_in)
-            logger.info(f"After make_features shape: {fe_df.shape}")
-
-            # Predict directly (same as /predict)
-            raw = m.predict(fe_df)
-            preds = np.expm1(raw)
-            price = float(preds[0]) if hasattr(preds, '__getitem__') else float(preds)
-
+            price = await predict_one(normalized_data)
             logger.info(f"Prediction successful: {price}")
 
+        except HTTPException:
+            # Inference queue full (503): overload, not a $0 house
+            raise
         except Exception as pred_error:
             logger.error(f"Prediction error: {pred_error}")
             logger.error(f"Normalized data sample: {dict(list(normalized_data.items())[:5])}")
@@ -569,6 +1014,10 @@ async def llm_query(data: Dict[str, str] = Body(...)):
             "properties": properties
         }
 
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"LLM query error: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error en LLM query: {type(e).__name__}: {str(e)[:200]}")
@@ -0,0 +1,150 @@
+"""
+Launcher de producción.
+
+El proceso master importa la app y precarga los modelos (main.preload) y
+después hace fork de WEB_CONCURRENCY workers uvicorn que comparten el mismo
+socket; los workers heredan el modelo copy-on-write en vez de cargar cada uno
+su copia. El master reemplaza a los workers que terminan (crash o reciclaje
+por MAX_REQUESTS) y en SIGTERM/SIGINT hace un apagado ordenado.
+
+Uso (desde server/):
+    python src/serve.py
+
+Variables:
+    WEB_CONCURRENCY      workers (default: CPUs del contenedor, ver utils.resources.available_cpus)
+    MAX_REQUESTS         reciclar cada worker tras N requests (default 0 = nunca)
+    MAX_REQUESTS_JITTER  + aleatorio en [0, J] por worker para que no reciclen todos juntos
+    GRACEFUL_TIMEOUT     segundos para terminar requests en curso al apagar (default 30)
+    FASTAPI_HOST / FASTAPI_PORT
+"""
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from config import setup_logging
+from utils.resources import available_cpus
+
+logger = setup_logging()
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(available_cpus())))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# routes lee WEB_CONCURRENCY al importarse para repartir INFERENCE_WORKERS entre procesos
+os.environ["WEB_CONCURRENCY"] = str(WEB_CONCURRENCY)
+
+
+def _bind(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock):
+    import uvicorn
+
+    limit = MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER) if MAX_REQUESTS else None
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        log_level="info",
+        limit_max_requests=limit,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+    )
+    # uvicorn instala sus propios handlers: SIGTERM/SIGINT terminan los requests en curso y salen
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock):
+    pid = os.fork()
+    if pid == 0:
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+            signal.signal(sig, signal.SIG_DFL)
+        random.seed()
+        code = 0
+        try:
+            _run_worker(app, sock)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    logger.info(f"Worker {pid} started")
+    return pid
+
+
+def run(host=None, port=None):
+    host = host or os.getenv("FASTAPI_HOST", "0.0.0.0")
+    port = port or int(os.getenv("FASTAPI_PORT", "8000"))
+    sock = _bind(host, port)
+
+    import main
+    # Carga antes del fork. El warm-up (primeras predicciones) corre en cada worker: el pool
+    # OpenMP de LightGBM no sobrevive a un fork si el master ya lo inicializó
+    main.preload()
+
+    logger.info(
+        f"Serving on {host}:{port} with {WEB_CONCURRENCY} workers "
+        f"(max_requests={MAX_REQUESTS}+{MAX_REQUESTS_JITTER}, graceful_timeout={GRACEFUL_TIMEOUT}s)"
+    )
+    workers = {_spawn(main.app, sock): time.monotonic() for _ in range(WEB_CONCURRENCY)}
+    stopping = False
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"Received {signal.Signals(signum).name}, stopping {len(workers)} workers")
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        signal.alarm(GRACEFUL_TIMEOUT + 5)
+
+    def kill_remaining(_signum, _frame):
+        for pid in workers:
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, kill_remaining)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if stopping:
+            logger.info(f"Worker {pid} exited ({code})")
+            continue
+
+        logger.info(f"Worker {pid} exited ({code}), starting a replacement")
+        if code != 0 and time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # evita un loop de crashes
+        workers[_spawn(main.app, sock)] = time.monotonic()
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    run()
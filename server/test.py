@@ -6,18 +6,21 @@ import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 log = logging.getLogger("test_prediction")
 sys.path.append("../")
-from utils.utils_yose import load_data
+from utils.utils_yose import load_data_columnar
 
-url = "http://localhost:8000/predict"
+url = "http://localhost:8000/api/predict"
 #url = "http://127.0.0.1:8000/predict-app"
 data_url = "../data/housing_data/"
-_, test = load_data(data_url)
+_, test = load_data_columnar(data_url)
 test = test.drop(["Id"], axis=1)
+# HouseFeaturesRaw espera "NA" (no null) en categóricas sin valor
+obj_cols = test.select_dtypes(include=["object"]).columns
+test[obj_cols] = test[obj_cols].fillna("NA")
 row = test.iloc[4]
-row = row.where(pd.notna(row), None) 
 print(row)
 
-clean = {k: (v.item() if isinstance(v, (np.floating, np.integer)) else v) for k, v in row.to_dict().items()}
+# Numéricas faltantes se omiten (el server las imputa, igual que si vinieran como null)
+clean = {k: (v.item() if isinstance(v, (np.floating, np.integer)) else v) for k, v in row.items() if pd.notna(v)}
 
 print("\n========================================================================")
 print("Prueba de predicción")
@@ -0,0 +1,115 @@
+"""
+Fixtures for the server tests: a local stub model in place of GroqModel and
+stub price models behind the ModelHolder / micro-batcher / prediction cache.
+
+Uso (desde server/):
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import sys
+import types
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(SERVER_DIR, "src"), os.path.join(SERVER_DIR, "..")]
+os.environ.setdefault("GROQ_API_KEY", "test")  # the Groq client needs one; it's never called
+os.environ["LLM_CACHE_PATH"] = ""              # each test builds its own cache file
+
+import threading
+
+import numpy as np
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+import llm_cache
+import routes
+from batcher import MicroBatcher
+from inference import InferencePool
+from llm_cache import CompletionCache, SingleFlight
+from llm_client import ResilientCaller
+from model_holder import ModelHolder
+from prediction_cache import PredictionCache
+
+HOUSE = {"OverallQual": 7, "Neighborhood": "NAmes"}
+TTL = 60.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch, clock):
+    """
+    Stub LLM behind routes.house_agent. ``calls`` gets the user prompt of each
+    upstream call; ``output`` is the text it answers (streamed in 16-char deltas).
+    """
+    stub = types.SimpleNamespace(calls=[], output=json.dumps(HOUSE))
+
+    async def respond(messages, info):
+        stub.calls.append(messages[-1].parts[-1].content)
+        await asyncio.sleep(0.05)  # long enough for concurrent callers to overlap
+        return ModelResponse(parts=[TextPart(stub.output)])
+
+    async def stream(messages, info):
+        stub.calls.append(messages[-1].parts[-1].content)
+        for i in range(0, len(stub.output), 16):
+            await asyncio.sleep(0)
+            yield stub.output[i:i + 16]
+
+    monkeypatch.setattr(routes, "completion_cache", CompletionCache(str(tmp_path / "llm.sqlite"), TTL))
+    monkeypatch.setattr(routes, "llm_singleflight", SingleFlight())
+    monkeypatch.setattr(routes, "llm_caller", ResilientCaller(max_attempts=1, hedge=False))
+    with routes.house_agent.override(model=FunctionModel(respond, stream_function=stream)):
+        yield stub
+
+
+class PriceModel:
+    """Stub serving model: the same price for every row (in log space, like the real one)."""
+
+    def __init__(self, price, gated=False):
+        self.price = price
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        if not gated:
+            self.release.set()
+
+    def predict(self, X):
+        self.calls += 1
+        self.entered.set()
+        assert self.release.wait(5)
+        return np.full(len(X), np.log1p(self.price))
+
+
+@pytest.fixture
+def serving(monkeypatch):
+    """
+    Fresh ModelHolder, inference pool, micro-batcher and prediction cache in
+    routes. ``add(version, price)`` registers a model, ``version`` is what the
+    registry alias points to.
+    """
+    state = types.SimpleNamespace(models={}, version=None, loads=[])
+
+    def load(version):
+        state.loads.append(version)
+        return state.models[version]
+
+    def add(version, price, gated=False):
+        state.models[version] = PriceModel(price, gated)
+        return state.models[version]
+
+    state.add = add
+    state.row = routes.normalize_house_data(routes.validate_and_fix_house_data(routes.example_house()))
+    pool = InferencePool(4)
+    monkeypatch.setattr(routes, "model_holder", ModelHolder(load, lambda: state.version))
+    monkeypatch.setattr(routes, "inference_pool", pool)
+    monkeypatch.setattr(routes, "predict_batcher", MicroBatcher(routes.predict_pinned, routes.run_pooled, max_batch=8))
+    monkeypatch.setattr(routes, "prediction_cache", PredictionCache(100, TTL))
+    yield state
+    pool.shutdown()
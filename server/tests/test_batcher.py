@@ -0,0 +1,120 @@
+"""MicroBatcher: flush on size and on timeout, failing rows and cancellation."""
+import asyncio
+
+import pytest
+
+from batcher import MicroBatcher
+from inference import PoolFullError
+
+
+class Recorder:
+    """predict_fn that doubles each row and remembers the batches it got."""
+
+    def __init__(self, bad=()):
+        self.batches = []
+        self.bad = set(bad)
+
+    def __call__(self, rows):
+        self.batches.append(list(rows))
+        if self.bad & set(rows):
+            raise ValueError(f"bad rows {sorted(self.bad & set(rows))}")
+        return [2 * r for r in rows]
+
+
+async def run_inline(fn, *args):
+    return fn(*args)
+
+
+def test_flushes_when_the_batch_is_full():
+    predict = Recorder()
+    batcher = MicroBatcher(predict, run_inline, max_batch=4, max_wait_ms=60_000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), 1)
+
+    assert asyncio.run(run()) == [0, 2, 4, 6]
+    assert predict.batches == [[0, 1, 2, 3]]
+    assert batcher.stats()["batch_size_hist"]["le_4"] == 1
+
+
+def test_flushes_after_max_wait():
+    predict = Recorder()
+    batcher = MicroBatcher(predict, run_inline, max_batch=64, max_wait_ms=20)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        return results, loop.time() - t0
+
+    results, elapsed = asyncio.run(run())
+    assert results == [0, 2, 4]
+    assert predict.batches == [[0, 1, 2]]
+    assert elapsed >= 0.015
+
+
+def test_failing_row_only_fails_its_own_request():
+    predict = Recorder(bad={2})
+    batcher = MicroBatcher(predict, run_inline, max_batch=4, max_wait_ms=60_000)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(4)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results[:2] == [0, 2] and results[3] == 6
+    assert isinstance(results[2], ValueError)
+    assert predict.batches[0] == [0, 1, 2, 3]
+    assert sorted(b[0] for b in predict.batches[1:]) == [0, 1, 2, 3]
+    assert batcher.stats()["split_batches"] == 1
+
+
+def test_full_queue_fails_the_batch_without_splitting():
+    calls = []
+
+    async def full_pool(fn, *args):
+        calls.append(args)
+        raise PoolFullError("Inference queue full (8 waiting)")
+
+    batcher = MicroBatcher(Recorder(), full_pool, max_batch=4, max_wait_ms=60_000)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(4)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, PoolFullError) for r in results)
+    assert len(calls) == 1
+    assert batcher.stats()["split_batches"] == 0
+
+
+def test_cancelled_caller_is_left_out_of_the_batch():
+    predict = Recorder()
+    batcher = MicroBatcher(predict, run_inline, max_batch=64, max_wait_ms=20)
+
+    async def run():
+        gone = asyncio.ensure_future(batcher.submit(1))
+        kept = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        gone.cancel()  # client disconnected while the batch was still collecting
+        return await kept
+
+    assert asyncio.run(run()) == 4
+    assert predict.batches == [[2]]
+
+
+def test_cancelled_batch_cancels_its_callers():
+    async def run():
+        entered = asyncio.Event()
+
+        async def stuck(fn, *args):
+            entered.set()
+            await asyncio.sleep(60)
+
+        batcher = MicroBatcher(Recorder(), stuck, max_batch=2, max_wait_ms=60_000)
+        callers = [asyncio.ensure_future(batcher.submit(i)) for i in range(2)]
+        await entered.wait()
+        for task in list(batcher._tasks):
+            task.cancel()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
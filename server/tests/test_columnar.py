@@ -0,0 +1,33 @@
+"""utils_yose.load_data_columnar: same frames as load_data, writable unless copy=False."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from utils.utils_yose import load_data, load_data_columnar
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "housing_data")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in ("train.csv", "test.csv"):
+        shutil.copy(os.path.join(DATA_DIR, name), tmp_path)
+    return str(tmp_path)
+
+
+def test_default_frames_match_read_csv_and_are_writable(data_dir):
+    train, test = load_data_columnar(data_dir)
+    ref_train, ref_test = load_data(data_dir)
+    pd.testing.assert_frame_equal(train, ref_train)
+    pd.testing.assert_frame_equal(test, ref_test)
+
+    test.loc[0, "LotArea"] = 5
+    assert test.loc[0, "LotArea"] == 5
+
+
+def test_zero_copy_frames_are_read_only(data_dir):
+    _, test = load_data_columnar(data_dir, copy=False)
+    with pytest.raises(ValueError, match="read-only"):
+        test.loc[0, "LotArea"] = 5
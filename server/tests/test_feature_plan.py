@@ -0,0 +1,66 @@
+"""utils.feature_plan.make_features_fast must match utils_yose.make_features exactly."""
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.feature_plan import ImputationTable, compile_feature_plan, make_features_fast
+from utils.utils_yose import fit_imputation_stats, load_data, make_features
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "housing_data")
+
+
+@pytest.fixture(scope="module")
+def housing():
+    train, test = load_data(DATA_DIR)
+    stats = fit_imputation_stats(train.drop(columns=["Id", "SalePrice"]))
+    return test.drop(columns=["Id"]), stats
+
+
+def _assert_same(df, stats=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = make_features(df, stats=stats)
+        got = make_features_fast(df, ImputationTable(stats) if stats is not None else None)
+    pd.testing.assert_frame_equal(expected, got, check_exact=True)
+
+
+@pytest.mark.parametrize("n", [1, 100, 3000])
+def test_matches_make_features(housing, n):
+    test, _ = housing
+    df = pd.concat([test] * -(-n // len(test)), ignore_index=True).iloc[:n]
+    assert compile_feature_plan(df).supported
+    _assert_same(df)
+
+
+@pytest.mark.parametrize("n", [1, 100])
+def test_matches_make_features_with_imputation_table(housing, n):
+    test, stats = housing
+    # Rows with missing LotFrontage / MasVnrArea / GarageYrBlt, where the table is used
+    df = test[test[["LotFrontage", "MasVnrArea", "GarageYrBlt"]].isna().any(axis=1)].iloc[:n]
+    assert len(df) == n
+    _assert_same(df, stats)
+
+
+def test_one_row_with_none_values(housing):
+    test, stats = housing
+    # Like the server: from_records over dicts, numerics sent as None
+    record = test.iloc[0].replace({np.nan: None}).to_dict()
+    record.update(LotFrontage=None, MasVnrArea=None, Alley=None)
+    df = pd.DataFrame.from_records([record])
+    assert df["LotFrontage"].dtype == object
+    _assert_same(df, stats)
+
+    df[["LotFrontage", "MasVnrArea"]] = df[["LotFrontage", "MasVnrArea"]].astype(float)
+    assert compile_feature_plan(df).supported
+    _assert_same(df, stats)
+
+
+def test_object_numeric_column_falls_back(housing):
+    test, stats = housing
+    df = test.iloc[:50].copy()
+    df["LotArea"] = df["LotArea"].astype(object)
+    df.loc[df.index[::7], "LotArea"] = None
+    _assert_same(df, stats)
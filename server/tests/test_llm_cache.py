@@ -0,0 +1,46 @@
+"""routes.complete_house (/api/llm) against the stub model: persistent cache, TTL and single-flight."""
+import asyncio
+import json
+
+import routes
+from conftest import HOUSE, TTL
+from llm_cache import CompletionCache
+
+
+def test_cache_hit_skips_upstream(upstream):
+    async def run():
+        first = await routes.complete_house("casa de 3 recámaras en NAmes")
+        # Same prompt up to whitespace
+        second = await routes.complete_house("  casa de 3 recámaras\nen NAmes ")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert json.loads(first) == json.loads(second) == HOUSE
+    assert len(upstream.calls) == 1
+    assert routes.completion_cache.stats()["hits"] == 1
+
+
+def test_prompt_case_is_part_of_the_key():
+    assert CompletionCache.make_key("Casa en NAmes", "m", "s") != CompletionCache.make_key("casa en names", "m", "s")
+    assert CompletionCache.make_key("casa  en\tNAmes", "m", "s") == CompletionCache.make_key("casa en NAmes", "m", "s")
+
+
+def test_expired_entry_goes_upstream_and_is_purged(upstream, clock):
+    asyncio.run(routes.complete_house("casa en OldTown"))
+    clock[0] += TTL + 1
+    asyncio.run(routes.complete_house("casa en NAmes"))  # this put purges the expired row
+    assert routes.completion_cache.stats()["entries"] == 1
+    assert routes.completion_cache.stats()["purged"] == 1
+
+    asyncio.run(routes.complete_house("casa en OldTown"))
+    assert upstream.calls == ["casa en OldTown", "casa en NAmes", "casa en OldTown"]
+
+
+def test_concurrent_identical_prompts_share_one_call(upstream):
+    async def run():
+        return await asyncio.gather(*(routes.complete_house("casa con piscina") for _ in range(10)))
+
+    outputs = asyncio.run(run())
+    assert len(set(outputs)) == 1
+    assert len(upstream.calls) == 1
+    assert routes.llm_singleflight.stats() == {"inflight": 0, "calls": 1, "joined": 9}
@@ -0,0 +1,112 @@
+"""llm_client: circuit breaker states, which errors count, retries and hedging."""
+import asyncio
+import types
+
+import httpx
+import pytest
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+
+import llm_client
+from llm_client import CircuitBreaker, CircuitOpenError, ResilientCaller, is_upstream_failure
+
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_client, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _http_error(status):
+    return ModelHTTPError(status_code=status, model_name="m", body={"error": "x"})
+
+
+def test_breaker_closed_open_half_open(monotonic):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow() and breaker.rejected == 1
+
+    monotonic[0] += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()       # the trial call
+    assert not breaker.allow()   # everyone else waits for its verdict
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opens == 2
+
+    monotonic[0] += 30
+    assert breaker.allow()
+    breaker.release()            # trial cancelled: another caller may try
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_only_timeouts_connection_errors_and_5xx_are_upstream_failures():
+    assert is_upstream_failure(TimeoutError())
+    assert is_upstream_failure(httpx.ConnectError("refused"))
+    assert is_upstream_failure(ModelAPIError(model_name="m", message="connection reset"))
+    assert is_upstream_failure(_http_error(503))
+    assert not is_upstream_failure(_http_error(400))
+    assert not is_upstream_failure(_http_error(401))
+    assert not is_upstream_failure(_http_error(429))
+    assert not is_upstream_failure(ValueError("bad output"))
+
+
+def _failing(error, calls):
+    async def fn():
+        calls.append(1)
+        raise error
+    return fn
+
+
+def test_4xx_is_not_retried_and_does_not_open_the_breaker():
+    caller = ResilientCaller(max_attempts=3, hedge=False, breaker=CircuitBreaker(failure_threshold=1))
+    calls = []
+    for _ in range(3):
+        with pytest.raises(ModelHTTPError):
+            asyncio.run(caller.call(_failing(_http_error(401), calls)))
+
+    assert len(calls) == 3  # one attempt per call
+    assert caller.retries == 0
+    assert caller.breaker.state == "closed"
+
+
+def test_5xx_is_retried_and_opens_the_breaker():
+    caller = ResilientCaller(max_attempts=2, hedge=False, breaker=CircuitBreaker(failure_threshold=2))
+    calls = []
+    for _ in range(2):
+        with pytest.raises(ModelHTTPError):
+            asyncio.run(caller.call(_failing(_http_error(502), calls)))
+
+    assert len(calls) == 4 and caller.retries == 2
+    assert caller.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller.call(_failing(_http_error(502), calls)))
+    assert len(calls) == 4  # rejected without calling upstream
+
+
+def test_hedge_wins_and_cancels_the_slow_attempt():
+    caller = ResilientCaller(max_attempts=2, hedge=True, hedge_min_seconds=0.01)
+    for _ in range(20):
+        caller.latencies.add(0.01)
+    started, cancelled = [], []
+
+    async def fn():
+        n = len(started)
+        started.append(n)
+        if n == 0:
+            try:
+                await asyncio.sleep(10)  # the slow tail
+            except asyncio.CancelledError:
+                cancelled.append(n)
+                raise
+        return f"attempt {n}"
+
+    result = asyncio.run(asyncio.wait_for(caller.call(fn), 2))
+    assert result == "attempt 1"
+    assert cancelled == [0]
+    assert caller.hedges == 1 and caller.hedge_wins == 1
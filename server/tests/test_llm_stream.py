@@ -0,0 +1,73 @@
+"""routes.stream_house_events (/api/llm/stream) against the stub model."""
+import asyncio
+import json
+
+import routes
+
+
+async def _events(prompt):
+    return [json.loads(line) async for line in routes.stream_house_events(prompt)]
+
+
+def _full_house():
+    return json.dumps(routes.example_house())
+
+
+def test_failed_prediction_is_price_zero_mid_stream(upstream, monkeypatch):
+    async def failing_predict(row):
+        raise ValueError("bad row")
+
+    monkeypatch.setattr(routes, "predict_one", failing_predict)
+    # Trailing text after the object: the price is sent while the stream is still open
+    upstream.output = _full_house() + " " * 64
+    events = asyncio.run(_events("casa en NAmes"))
+
+    assert [e["event"] for e in events if e["event"] != "property"] == ["price", "done"]
+    assert events[-2]["price"] == events[-1]["price"] == 0
+
+
+def test_malformed_text_does_not_abort_stream(upstream, monkeypatch):
+    async def predict(row):
+        return 123.0
+
+    monkeypatch.setattr(routes, "predict_one", predict)
+    upstream.output = '{"OverallQual": 7, "GrLivArea": 1500, oops}'
+    events = asyncio.run(_events("casa en NAmes"))
+
+    # Fields before the bad token are kept and the house is priced with them, as /llm does
+    assert [e["event"] for e in events] == ["property", "property", "price", "done"]
+    assert events[-1]["price"] == 123.0
+
+
+def test_stream_joins_inflight_llm_call(upstream, monkeypatch):
+    async def predict(row):
+        return 123.0
+
+    monkeypatch.setattr(routes, "predict_one", predict)
+    upstream.output = _full_house()
+
+    async def run():
+        llm = asyncio.ensure_future(routes.complete_house("casa en NAmes"))
+        await asyncio.sleep(0)  # /api/llm's upstream call is in flight
+        events = await _events("casa en NAmes")
+        await llm
+        return events
+
+    events = asyncio.run(run())
+    assert len(upstream.calls) == 1
+    assert events[-1]["event"] == "done"
+    assert len(events[-1]["properties"]) == len(routes.example_house())
+
+
+def test_processing_error_is_not_an_upstream_failure(upstream, monkeypatch):
+    def broken_fix(data):
+        raise RuntimeError("validation bug")
+
+    monkeypatch.setattr(routes, "validate_and_fix_house_data", broken_fix)
+    events = asyncio.run(_events("casa en NAmes"))
+
+    # The stream reports the error, but the breaker doesn't count it against Groq
+    assert events[-1]["event"] == "error"
+    breaker = routes.llm_caller.breaker
+    assert breaker.failures == 0 and breaker.state == "closed"
+    assert routes.llm_caller.failures == 0
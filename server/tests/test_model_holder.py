@@ -0,0 +1,82 @@
+"""ModelHolder: single load, hot-reload swap and version polling."""
+import asyncio
+import threading
+
+import pytest
+
+import routes
+from model_holder import ModelHolder
+
+
+def test_concurrent_first_requests_share_one_load():
+    loads = []
+    started = threading.Event()
+
+    def load(version):
+        loads.append(version)
+        started.wait(1)
+        return object()
+
+    holder = ModelHolder(load, lambda: "1")
+    threads = [threading.Thread(target=holder.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    started.set()
+    for t in threads:
+        t.join()
+
+    assert loads == ["1"]
+    assert holder.version == "1"
+
+
+def test_refresh_swaps_only_when_the_version_moves():
+    version = ["1"]
+    warmed = []
+    holder = ModelHolder(lambda v: f"model-{v}", lambda: version[0], warmup=warmed.append)
+
+    assert holder.snapshot() == ("model-1", "1")
+    assert not holder.refresh()
+    version[0] = None  # registry unreachable: keep serving
+    assert not holder.refresh()
+    version[0] = "2"
+    assert holder.refresh()
+    assert holder.snapshot() == ("model-2", "2")
+    assert warmed == ["model-2"]
+
+
+def test_failed_reload_keeps_the_serving_model():
+    version = ["1"]
+
+    def load(v):
+        if v == "2":
+            raise RuntimeError("broken artifact")
+        return f"model-{v}"
+
+    holder = ModelHolder(load, lambda: version[0])
+    holder.get()
+    version[0] = "2"
+    with pytest.raises(RuntimeError):
+        holder.refresh()
+    assert holder.snapshot() == ("model-1", "1")
+
+
+def test_inflight_request_keeps_its_snapshot_across_a_swap(serving):
+    old = serving.add("1", 100_000.0, gated=True)
+    serving.add("2", 200_000.0)
+    serving.version = "1"
+
+    async def run():
+        first = asyncio.ensure_future(routes.predict_one(serving.row))
+        await asyncio.to_thread(old.entered.wait, 5)
+        # The alias moves while the first request is inside predict
+        serving.version = "2"
+        assert await asyncio.to_thread(routes.model_holder.refresh)
+        second = await routes.predict_one(serving.row)
+        old.release.set()
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert first == pytest.approx(100_000.0)
+    assert second == pytest.approx(200_000.0)
+    assert serving.loads == ["1", "2"]
+    assert routes.model_holder.version == "2"
@@ -0,0 +1,31 @@
+"""routes.predict_prices: feature frame handed to the model."""
+import numpy as np
+import pandas as pd
+
+import routes
+
+
+class RecordingModel:
+    def __init__(self):
+        self.frames = []
+
+    def predict(self, X):
+        self.frames.append(X)
+        return np.zeros(len(X))
+
+
+def _normalized(**overrides):
+    house = dict(routes.example_house(), **overrides)
+    return routes.normalize_house_data(routes.validate_and_fix_house_data(house))
+
+
+def test_one_row_with_missing_numerics_is_imputed_like_a_batch():
+    missing = _normalized(LotFrontage=None, MasVnrArea=None, GarageYrBlt=None)
+    model = RecordingModel()
+
+    routes.predict_prices([missing], model=model)
+    routes.predict_prices([missing, _normalized()], model=model)
+    alone, batched = model.frames
+
+    assert not alone.select_dtypes(include="object").columns.intersection(routes.NUMERIC_FIELDS).size
+    pd.testing.assert_frame_equal(alone, batched.iloc[:1], check_dtype=False)
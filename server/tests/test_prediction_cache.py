@@ -0,0 +1,73 @@
+"""PredictionCache: LRU eviction, TTL expiry and keys per model version."""
+import asyncio
+import types
+
+import pytest
+
+import prediction_cache
+import routes
+from prediction_cache import PredictionCache
+
+ROW = {"OverallQual": 7, "Neighborhood": "NAmes"}
+
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(prediction_cache, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    a, b, c = (PredictionCache.make_key(dict(ROW, LotArea=n), "1") for n in (1, 2, 3))
+    cache.put(a, 1.0)
+    cache.put(b, 2.0)
+    assert cache.get(a) == 1.0  # a is now the most recent
+    cache.put(c, 3.0)
+
+    assert cache.get(b) is None
+    assert cache.get(a) == 1.0 and cache.get(c) == 3.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entry_expires_after_ttl(monotonic):
+    cache = PredictionCache(max_entries=10, ttl_seconds=60)
+    key = PredictionCache.make_key(ROW, "1")
+    cache.put(key, 1.0)
+
+    monotonic[0] += 59
+    assert cache.get(key) == 1.0
+    monotonic[0] += 2
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_key_depends_on_model_version_not_dict_order():
+    assert PredictionCache.make_key(ROW, "1") != PredictionCache.make_key(ROW, "2")
+    assert PredictionCache.make_key(ROW, "1") == PredictionCache.make_key(dict(reversed(list(ROW.items()))), "1")
+
+
+def test_zero_entries_disables_the_cache():
+    cache = PredictionCache(max_entries=0)
+    key = PredictionCache.make_key(ROW, "1")
+    cache.put(key, 1.0)
+    assert cache.get(key) is None and cache.stats()["entries"] == 0
+
+
+def test_hot_reload_invalidates_cached_prices(serving):
+    old = serving.add("1", 100_000.0)
+    new = serving.add("2", 200_000.0)
+    serving.version = "1"
+
+    async def price():
+        return await routes.predict_one(serving.row)
+
+    assert asyncio.run(price()) == pytest.approx(100_000.0)
+    assert asyncio.run(price()) == pytest.approx(100_000.0)
+    assert old.calls == 1  # second one was a cache hit
+
+    serving.version = "2"
+    assert routes.model_holder.refresh()
+    assert asyncio.run(price()) == pytest.approx(200_000.0)
+    assert new.calls == 1
@@ -0,0 +1,301 @@
+"""
+Versión compilada de ``utils_yose.make_features`` para serving.
+
+``make_features`` encadena tres funciones que copian el DataFrame completo y
+recorren columna por columna. Aquí los índices de columnas y las tablas
+ordinales se preparan una sola vez por layout de entrada (``FeaturePlan``) y
+luego se aplican sobre arrays de NumPy en una sola pasada, construyendo un
+único DataFrame al final. La salida es idéntica (valores, dtypes y orden de
+columnas) a ``make_features``; si la entrada trae dtypes que el plan no cubre
+se usa ``make_features`` tal cual.
+"""
+
+import warnings
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.utils_yose import (
+    ENGINEERED_NUM_COLS,
+    MODE_FILLS,
+    NONE_FILL_COLS,
+    ORDINAL_SPECS,
+    make_features,
+)
+
+# Columnas que add_engineered_features usa sin comprobar que existan
+_REQUIRED_NUM_COLS = [
+    "TotalBsmtSF",
+    "1stFlrSF",
+    "2ndFlrSF",
+    "FullBath",
+    "HalfBath",
+    "BsmtFullBath",
+    "BsmtHalfBath",
+    "OpenPorchSF",
+    "EnclosedPorch",
+    "3SsnPorch",
+    "ScreenPorch",
+    "WoodDeckSF",
+    "YrSold",
+    "YearBuilt",
+    "YearRemodAdd",
+    "PoolArea",
+    "GarageArea",
+]
+
+# Columnas que el plan espera como texto (object) o numéricas para reproducir fillna/map
+_OBJECT_COLS = set(NONE_FILL_COLS) | set(MODE_FILLS) | {c for c, _ in ORDINAL_SPECS}
+_OBJECT_COLS.add("Neighborhood")
+_NUMERIC_COLS = {"LotFrontage", "MasVnrArea"}
+
+
+def _fill0(a: np.ndarray) -> np.ndarray:
+    # Equivalente a Series.fillna(0)
+    if a.dtype.kind == "f":
+        mask = np.isnan(a)
+        if mask.any():
+            a = a.copy()
+            a[mask] = 0
+    return a
+
+
+def _fill_from(a: np.ndarray, other: np.ndarray) -> np.ndarray:
+    # Equivalente a Series.fillna(other_series)
+    if a.dtype.kind == "f":
+        mask = np.isnan(a)
+        if mask.any():
+            return np.where(mask, other, a)
+    return a
+
+
+def _fill_object(a: np.ndarray, value: str) -> np.ndarray:
+    mask = pd.isna(a)
+    if mask.any():
+        a = a.copy()
+        a[mask] = value
+    return a
+
+
+def _group_median_fill(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    # groupby(groups)[values].transform(lambda s: s.fillna(s.median()))
+    codes, _ = pd.factorize(groups)
+    missing = codes < 0
+    nan_mask = np.isnan(values) if values.dtype.kind == "f" else None
+
+    if nan_mask is not None and nan_mask.any():
+        out = values.copy()
+        for g in np.unique(codes[nan_mask & ~missing]):
+            in_group = codes == g
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                med = np.nanmedian(values[in_group])
+            out[in_group & nan_mask] = med
+    else:
+        out = values
+
+    # Filas sin grupo (Neighborhood nulo) quedan en NaN, como en transform
+    if missing.any():
+        out = out.astype(float, copy=True)
+        out[missing] = np.nan
+    return out
+
+
+def _lookup_fill(values: np.ndarray, groups: np.ndarray, keys: pd.Index, table: np.ndarray) -> np.ndarray:
+    # values.fillna(groups.map(table_dict).fillna(global)); table trae el global al final
+    if values.dtype.kind == "f":
+        mask = np.isnan(values)
+        if mask.any():
+            out = values.copy()
+            out[mask] = table[keys.get_indexer(groups[mask])]
+            return out
+    return values
+
+
+class ImputationTable:
+    """Medianas de ``fit_imputation_stats`` preparadas para lookup vectorizado."""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+        by_nbhd = stats["lot_frontage_by_neighborhood"]
+        self.neighborhoods = pd.Index(list(by_nbhd.keys()), dtype=object)
+        self.lot_frontage = np.array(
+            list(by_nbhd.values()) + [stats["lot_frontage_median"]], dtype=float
+        )
+        self.medians: Dict[str, float] = stats["numeric_medians"]
+
+
+class FeaturePlan:
+    """Plan de features compilado para un layout (columnas, dtypes) de entrada."""
+
+    def __init__(self, columns: Tuple[Hashable, ...], dtypes: Tuple[np.dtype, ...]):
+        self.columns = list(columns)
+        self.index: Dict[Hashable, int] = {c: i for i, c in enumerate(self.columns)}
+        self.supported = self._check_supported(dict(zip(columns, dtypes)))
+
+        present = self.index
+        self.num_cols = [c for c in ENGINEERED_NUM_COLS if c in present]
+        self.none_cols = [c for c in NONE_FILL_COLS if c in present]
+        self.mode_fills = [(c, v) for c, v in MODE_FILLS.items() if c in present]
+        self.has_garage_yr = "GarageYrBlt" in present
+        self.has_qual_area = "OverallQual" in present and "GrLivArea" in present
+        self.fill_lot_frontage = "LotFrontage" in present and "Neighborhood" in present
+        self.fill_garage_yr = self.has_garage_yr and "YearBuilt" in present
+        self.fill_mas_vnr = "MasVnrArea" in present and "MasVnrType" in present
+        self.cat_copies = [
+            (f"{c}_cat", c) for c in ("MSSubClass", "MoSold", "YrSold") if c in present
+        ]
+        # Columnas object que ya no pueden tener nulos al llegar al fill "Unknown"
+        self.filled_object_cols = (
+            set(self.none_cols)
+            | {c for c, _ in self.mode_fills}
+            | {name for name, _ in self.cat_copies}
+        )
+
+        # Tablas ordinales: Index para lookup vectorizado + valores con 0 al final (no encontrado)
+        self.ordinal_tables = []
+        for col, mapper in ORDINAL_SPECS:
+            if col in present:
+                keys = pd.Index(list(mapper.keys()), dtype=object)
+                values = np.array(list(mapper.values()) + [0], dtype=int)
+                self.ordinal_tables.append((col, keys, values))
+
+    def _check_supported(self, dtypes: Dict[Hashable, np.dtype]) -> bool:
+        if len(dtypes) != len(self.columns):
+            return False
+        if any(c not in dtypes for c in _REQUIRED_NUM_COLS):
+            return False
+        for c, dt in dtypes.items():
+            if not isinstance(dt, np.dtype) or dt.kind not in "iufO":
+                return False
+            if c in _OBJECT_COLS and dt.kind != "O":
+                return False
+            if c in _NUMERIC_COLS and dt.kind not in "iuf":
+                return False
+        return True
+
+    def transform(self, df: pd.DataFrame, imputation: Optional[ImputationTable] = None) -> pd.DataFrame:
+        stats = imputation.stats if imputation is not None else None
+        if not self.supported:
+            return make_features(df, stats=stats)
+
+        out: Dict[Hashable, np.ndarray] = {c: df[c].to_numpy() for c in self.columns}
+
+        # --- add_engineered_features ---
+        for c in self.num_cols:
+            if out[c].dtype.kind not in "iuf":
+                out[c] = pd.to_numeric(out[c], errors="coerce")
+        if any(out[c].dtype.kind not in "iuf" for c in self.num_cols):
+            return make_features(df, stats=stats)
+
+        f0 = {c: _fill0(out[c]) for c in _REQUIRED_NUM_COLS}
+
+        out["TotalSF"] = f0["TotalBsmtSF"] + f0["1stFlrSF"] + f0["2ndFlrSF"]
+        out["TotalBath"] = (
+            f0["FullBath"]
+            + 0.5 * f0["HalfBath"]
+            + f0["BsmtFullBath"]
+            + 0.5 * f0["BsmtHalfBath"]
+        )
+        out["TotalPorchSF"] = (
+            f0["OpenPorchSF"]
+            + f0["EnclosedPorch"]
+            + f0["3SsnPorch"]
+            + f0["ScreenPorch"]
+            + f0["WoodDeckSF"]
+        )
+
+        yr_sold = f0["YrSold"]
+        yb = f0["YearBuilt"]
+        if self.has_garage_yr:
+            gyr = out["GarageYrBlt"]
+        else:
+            gyr = np.full(len(df), np.nan)
+
+        out["HouseAge"] = yr_sold - yb
+        out["SinceRemodel"] = yr_sold - f0["YearRemodAdd"]
+        out["SinceGarage"] = yr_sold - _fill_from(gyr, yb)
+
+        out["HasPool"] = (f0["PoolArea"] > 0).astype(int)
+        out["Has2ndFloor"] = (f0["2ndFlrSF"] > 0).astype(int)
+        out["HasBsmt"] = (f0["TotalBsmtSF"] > 0).astype(int)
+        out["HasGarage"] = (f0["GarageArea"] > 0).astype(int)
+
+        if self.has_qual_area:
+            out["OverallQual_GrLivArea"] = _fill0(out["OverallQual"]) * _fill0(
+                out["GrLivArea"]
+            )
+
+        for name, src in self.cat_copies:
+            out[name] = out[src].astype(str).astype(object)
+
+        # --- fill_domain_na ---
+        for c in self.none_cols:
+            out[c] = _fill_object(out[c], "None")
+
+        if self.fill_lot_frontage:
+            if imputation is not None:
+                out["LotFrontage"] = _lookup_fill(
+                    out["LotFrontage"],
+                    out["Neighborhood"],
+                    imputation.neighborhoods,
+                    imputation.lot_frontage,
+                )
+            else:
+                out["LotFrontage"] = _group_median_fill(out["LotFrontage"], out["Neighborhood"])
+
+        if self.fill_garage_yr:
+            out["GarageYrBlt"] = _fill_from(out["GarageYrBlt"], out["YearBuilt"])
+
+        if self.fill_mas_vnr and out["MasVnrArea"].dtype.kind == "f":
+            area = out["MasVnrArea"]
+            mask = (out["MasVnrType"] == "None") & np.isnan(area)
+            if mask.any():
+                area = area.copy()
+                area[mask] = 0
+                out["MasVnrArea"] = area
+
+        for c, default in self.mode_fills:
+            out[c] = _fill_object(out[c], default)
+
+        medians = imputation.medians if imputation is not None else {}
+        for c, a in out.items():
+            if a.dtype.kind == "f":
+                mask = np.isnan(a)
+                if mask.any():
+                    if c in medians:
+                        med = medians[c]
+                    else:
+                        with warnings.catch_warnings():
+                            warnings.simplefilter("ignore", RuntimeWarning)
+                            med = np.nanmedian(a)
+                    a = a.copy()
+                    a[mask] = med
+                    out[c] = a
+            elif a.dtype.kind == "O" and c not in self.filled_object_cols:
+                out[c] = _fill_object(a, "Unknown")
+
+        # --- map_ordinal_categories ---
+        for c, keys, values in self.ordinal_tables:
+            out[c] = values[keys.get_indexer(out[c])]
+
+        return pd.DataFrame(out, index=df.index)
+
+
+_PLANS: Dict[Tuple, FeaturePlan] = {}
+
+
+def compile_feature_plan(df: pd.DataFrame) -> FeaturePlan:
+    """Devuelve (y cachea) el plan para el layout de columnas/dtypes de ``df``."""
+    key = (tuple(df.columns), tuple(df.dtypes))
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = FeaturePlan(*key)
+        _PLANS[key] = plan
+    return plan
+
+
+def make_features_fast(df: pd.DataFrame, imputation: Optional[ImputationTable] = None) -> pd.DataFrame:
+    """Drop-in de ``make_features(df, stats=imputation.stats)`` usando un plan compilado."""
+    return compile_feature_plan(df).transform(df, imputation)
@@ -0,0 +1,34 @@
+"""
+Recursos de la máquina compartidos por el server (serve.py, routes.py) y los
+scripts de ML (score.py). Sólo biblioteca estándar.
+"""
+
+import math
+import os
+
+
+def available_cpus() -> int:
+    """
+    CPUs que puede usar este proceso: la afinidad (taskset / cpuset) acotada por
+    la cuota de CPU del cgroup (el cpu de la task en ECS), si hay.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:  # cgroup v2: "<quota> <period>" o "max <period>"
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, int(quota) / int(period))
+    except (OSError, ValueError):
+        try:  # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if quota > 0:
+                cpus = min(cpus, quota / period)
+        except (OSError, ValueError):
+            pass
+    return max(1, math.floor(cpus))
@@ -6,7 +6,7 @@ import seaborn as sns
 
 import scipy.stats as stats
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from sklearn.preprocessing import OneHotEncoder, PowerTransformer
 from sklearn.impute import SimpleImputer
@@ -14,6 +14,7 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
 import os
+import json
 
 import sys
 
@@ -39,6 +40,86 @@ def load_data(sub_dir: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
     return df_train, df_test
 
 
+def convert_to_columnar(sub_dir: str, names=("train", "test")) -> Dict[str, str]:
+    """
+    Convierte cada <name>.csv (una sola vez) a dos archivos tipados con las
+    categóricas dictionary-encoded:
+      <name>.arrow    Arrow IPC sin comprimir, se carga memory-mapped sin copiar
+      <name>.parquet  comprimido, para guardar/compartir o leer por bloques
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out = {}
+    for name in names:
+        csv_path = os.path.join(sub_dir, f"{name}.csv")
+        if not os.path.exists(csv_path):
+            continue
+        df = pd.read_csv(csv_path)
+        obj_cols = df.select_dtypes(include=["object"]).columns
+        df[obj_cols] = df[obj_cols].astype("category")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        pq.write_table(table, os.path.join(sub_dir, f"{name}.parquet"))
+        arrow_path = os.path.join(sub_dir, f"{name}.arrow")
+        with pa.OSFile(arrow_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        out[name] = arrow_path
+    return out
+
+
+def load_table(sub_dir: str, name: str, columns: Optional[List[str]] = None,
+               categorical: bool = False, copy: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Carga <name>.arrow memory-mapped (lo genera desde el CSV si falta o es más
+    viejo). columns proyecta antes de convertir a pandas: las páginas de las
+    demás columnas nunca se leen. Con categorical=False las categóricas vuelven
+    como object, igual que pd.read_csv (make_features y build_preprocessor las
+    esperan así); con True quedan como category (códigos + diccionario).
+
+    Con copy=True (default) el DataFrame es una copia normal y se puede
+    modificar como el de pd.read_csv. Con copy=False las columnas numéricas sin
+    nulos son vistas del mapeo (sin copia ni memoria propia) y son de sólo
+    lectura: asignarles valores (df.loc[0, "LotArea"] = 5) falla con
+    "assignment destination is read-only"; reemplazar la columna entera sí
+    funciona.
+    """
+    import pyarrow as pa
+
+    csv_path = os.path.join(sub_dir, f"{name}.csv")
+    arrow_path = os.path.join(sub_dir, f"{name}.arrow")
+    if not os.path.exists(arrow_path) or (
+        os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(arrow_path)
+    ):
+        if not os.path.exists(csv_path):
+            return None
+        convert_to_columnar(sub_dir, names=(name,))
+
+    # Los buffers de la tabla apuntan al mapeo; no se cierra aquí, lo libera el GC con la tabla
+    table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    # split_blocks: una columna numérica sin nulos queda como vista del mapeo (sin copia);
+    # sin él to_pandas consolida los bloques, que ya es una copia escribible
+    df = table.to_pandas() if copy else table.to_pandas(split_blocks=True)
+    if not categorical:
+        for col in df.select_dtypes(include=["category"]).columns:
+            df[col] = df[col].astype(object)
+    return df
+
+
+def load_data_columnar(sub_dir: str, columns: Optional[List[str]] = None,
+                       categorical: bool = False, copy: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Como load_data pero desde los .arrow de convert_to_columnar (ver load_table).
+    copy=False evita la copia pero las columnas numéricas quedan de sólo lectura.
+    """
+    return (
+        load_table(sub_dir, "train", columns=columns, categorical=categorical, copy=copy),
+        load_table(sub_dir, "test", columns=columns, categorical=categorical, copy=copy),
+    )
+
+
 def plot_hist_per_columns(df, cols, bins=20):
     if isinstance(cols, str):
         cols = [cols]
@@ -240,32 +321,98 @@ def log_transform(data: pd.Series) -> pd.Series:
     return np.log1p(data)
 
 
+# Columnas/tablas compartidas por make_features y utils.feature_plan
+ENGINEERED_NUM_COLS = [
+    "TotalBsmtSF",
+    "1stFlrSF",
+    "2ndFlrSF",
+    "FullBath",
+    "HalfBath",
+    "BsmtFullBath",
+    "BsmtHalfBath",
+    "OpenPorchSF",
+    "EnclosedPorch",
+    "3SsnPorch",
+    "ScreenPorch",
+    "WoodDeckSF",
+    "YrSold",
+    "YearBuilt",
+    "YearRemodAdd",
+    "GarageYrBlt",
+    "PoolArea",
+    "GrLivArea",
+    "OverallQual",
+    "GarageArea",
+]
+
+NONE_FILL_COLS = [
+    "PoolQC",
+    "MiscFeature",
+    "Alley",
+    "Fence",
+    "FireplaceQu",
+    "GarageType",
+    "GarageFinish",
+    "GarageQual",
+    "GarageCond",
+    "BsmtQual",
+    "BsmtCond",
+    "BsmtExposure",
+    "BsmtFinType1",
+    "BsmtFinType2",
+    "MasVnrType",
+]
+
+MODE_FILLS: Dict[str, str] = {
+    "MSZoning": "RL",
+    "Functional": "Typ",
+    "Electrical": "SBrkr",
+    "KitchenQual": "TA",
+    "Exterior1st": "VinylSd",
+    "Exterior2nd": "VinylSd",
+    "SaleType": "WD",
+    "Utilities": "AllPub",
+}
+
+QUAL_MAP = {"Po": 1, "Fa": 2, "TA": 3, "Gd": 4, "Ex": 5, "None": 0}
+EXP_MAP = {"No": 0, "Mn": 1, "Av": 2, "Gd": 3, "None": 0}
+FIN_MAP = {"Unf": 1, "LwQ": 2, "Rec": 3, "BLQ": 4, "ALQ": 5, "GLQ": 6, "None": 0}
+FUNC_MAP = {
+    "Sal": 1,
+    "Sev": 2,
+    "Maj2": 3,
+    "Maj1": 4,
+    "Mod": 5,
+    "Min2": 6,
+    "Min1": 7,
+    "Typ": 8,
+}
+PAVE_MAP = {"N": 0, "P": 1, "Y": 2}
+
+ORDINAL_SPECS: List[Tuple[str, Dict[str, int]]] = [
+    ("ExterQual", QUAL_MAP),
+    ("ExterCond", QUAL_MAP),
+    ("BsmtQual", QUAL_MAP),
+    ("BsmtCond", QUAL_MAP),
+    ("HeatingQC", QUAL_MAP),
+    ("KitchenQual", QUAL_MAP),
+    ("FireplaceQu", QUAL_MAP),
+    ("GarageQual", QUAL_MAP),
+    ("GarageCond", QUAL_MAP),
+    ("PoolQC", QUAL_MAP),
+    ("BsmtExposure", EXP_MAP),
+    ("BsmtFinType1", FIN_MAP),
+    ("BsmtFinType2", FIN_MAP),
+    ("Functional", FUNC_MAP),
+    ("PavedDrive", PAVE_MAP),
+]
+
+
 def add_engineered_features(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
 
     # --- 1) Fuerza numérico en TODAS las columnas que usas en operaciones ---
-    num_cols = [
-        "TotalBsmtSF",
-        "1stFlrSF",
-        "2ndFlrSF",
-        "FullBath",
-        "HalfBath",
-        "BsmtFullBath",
-        "BsmtHalfBath",
-        "OpenPorchSF",
-        "EnclosedPorch",
-        "3SsnPorch",
-        "ScreenPorch",
-        "WoodDeckSF",
-        "YrSold",
-        "YearBuilt",
-        "YearRemodAdd",
-        "GarageYrBlt",
-        "PoolArea",
-        "GrLivArea",
-        "OverallQual",
-        "GarageArea",
-    ]
+    num_cols = ENGINEERED_NUM_COLS
     for c in num_cols:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
@@ -323,34 +470,31 @@ def add_engineered_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def fill_domain_na(df_all: pd.DataFrame) -> pd.DataFrame:
+def fill_domain_na(df_all: pd.DataFrame, stats: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Imputa nulos con reglas de dominio. Sin ``stats`` las medianas se calculan
+    sobre ``df_all``; con ``stats`` (ver ``fit_imputation_stats``) se usan las
+    medianas aprendidas en train, que es lo correcto para inferencia de 1 fila.
+    """
     df = df_all.copy()
 
-    none_cols = [
-        "PoolQC",
-        "MiscFeature",
-        "Alley",
-        "Fence",
-        "FireplaceQu",
-        "GarageType",
-        "GarageFinish",
-        "GarageQual",
-        "GarageCond",
-        "BsmtQual",
-        "BsmtCond",
-        "BsmtExposure",
-        "BsmtFinType1",
-        "BsmtFinType2",
-        "MasVnrType",
-    ]
+    none_cols = NONE_FILL_COLS
     for col in none_cols:
         if col in df.columns:
             df[col] = df[col].fillna("None")
 
     if "LotFrontage" in df.columns and "Neighborhood" in df.columns:
-        df["LotFrontage"] = df.groupby("Neighborhood")["LotFrontage"].transform(
-            lambda s: s.fillna(s.median())
-        )
+        if stats is not None:
+            lot_fill = (
+                df["Neighborhood"]
+                .map(stats["lot_frontage_by_neighborhood"])
+                .fillna(stats["lot_frontage_median"])
+            )
+            df["LotFrontage"] = df["LotFrontage"].fillna(lot_fill)
+        else:
+            df["LotFrontage"] = df.groupby("Neighborhood")["LotFrontage"].transform(
+                lambda s: s.fillna(s.median())
+            )
 
     if "GarageYrBlt" in df.columns and "YearBuilt" in df.columns:
         df["GarageYrBlt"] = df["GarageYrBlt"].fillna(df["YearBuilt"])
@@ -360,66 +504,60 @@ def fill_domain_na(df_all: pd.DataFrame) -> pd.DataFrame:
             df["MasVnrType"].eq("None"), "MasVnrArea"
         ].fillna(0)
 
-    mode_fills: Dict[str, str] = {
-        "MSZoning": "RL",
-        "Functional": "Typ",
-        "Electrical": "SBrkr",
-        "KitchenQual": "TA",
-        "Exterior1st": "VinylSd",
-        "Exterior2nd": "VinylSd",
-        "SaleType": "WD",
-        "Utilities": "AllPub",
-    }
+    mode_fills = MODE_FILLS
     for col, default in mode_fills.items():
         if col in df.columns:
             df[col] = df[col].fillna(default)
 
     numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
     categorical_columns = df.select_dtypes(include=["object"]).columns.tolist()
+    medians = stats["numeric_medians"] if stats is not None else {}
     for col in numeric_columns:
         if df[col].isna().any():
-            df[col] = df[col].fillna(df[col].median())
+            fill = medians[col] if col in medians else df[col].median()
+            df[col] = df[col].fillna(fill)
     for col in categorical_columns:
         if df[col].isna().any():
             df[col] = df[col].fillna("Unknown")
     return df
 
 
+def fit_imputation_stats(df_all: pd.DataFrame) -> Dict:
+    """
+    Aprende las medianas de imputación (por Neighborhood para LotFrontage y
+    globales para el resto de numéricas) sobre el set de entrenamiento crudo,
+    sin Id ni SalePrice.
+    """
+    df = add_engineered_features(df_all)
+
+    lot_by_nbhd = df.groupby("Neighborhood")["LotFrontage"].median().dropna()
+    numeric_medians = df.select_dtypes(include=[np.number]).median()
+
+    return {
+        "lot_frontage_by_neighborhood": {str(k): float(v) for k, v in lot_by_nbhd.items()},
+        "lot_frontage_median": float(df["LotFrontage"].median()),
+        "numeric_medians": {
+            str(k): float(v) for k, v in numeric_medians.items() if pd.notna(v)
+        },
+    }
+
+
+def save_imputation_stats(stats: Dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(stats, f, indent=2, sort_keys=True)
+
+
+def load_imputation_stats(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
 def map_ordinal_categories(df_all: pd.DataFrame) -> pd.DataFrame:
     df = df_all.copy()
 
-    qual_map = {"Po": 1, "Fa": 2, "TA": 3, "Gd": 4, "Ex": 5, "None": 0}
-    exp_map = {"No": 0, "Mn": 1, "Av": 2, "Gd": 3, "None": 0}
-    fin_map = {"Unf": 1, "LwQ": 2, "Rec": 3, "BLQ": 4, "ALQ": 5, "GLQ": 6, "None": 0}
-    func_map = {
-        "Sal": 1,
-        "Sev": 2,
-        "Maj2": 3,
-        "Maj1": 4,
-        "Mod": 5,
-        "Min2": 6,
-        "Min1": 7,
-        "Typ": 8,
-    }
-    pave_map = {"N": 0, "P": 1, "Y": 2}
-
-    ordinal_specs: List[Tuple[str, Dict[str, int]]] = [
-        ("ExterQual", qual_map),
-        ("ExterCond", qual_map),
-        ("BsmtQual", qual_map),
-        ("BsmtCond", qual_map),
-        ("HeatingQC", qual_map),
-        ("KitchenQual", qual_map),
-        ("FireplaceQu", qual_map),
-        ("GarageQual", qual_map),
-        ("GarageCond", qual_map),
-        ("PoolQC", qual_map),
-        ("BsmtExposure", exp_map),
-        ("BsmtFinType1", fin_map),
-        ("BsmtFinType2", fin_map),
-        ("Functional", func_map),
-        ("PavedDrive", pave_map),
-    ]
+    ordinal_specs = ORDINAL_SPECS
 
     for col, mapper in ordinal_specs:
         if col in df.columns:
@@ -428,16 +566,21 @@ def map_ordinal_categories(df_all: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def build_preprocessor(df_all: pd.DataFrame) -> ColumnTransformer:
+def build_preprocessor(df_all: pd.DataFrame, sparse: bool = False) -> ColumnTransformer:
+    """
+    Numéricas: mediana + Yeo-Johnson; categóricas: moda + one-hot.
+    sparse=True deja la salida completa en CSR (el bloque one-hot nunca se densifica);
+    ElasticNet y LightGBM la aceptan tal cual.
+    """
     numeric_features = df_all.select_dtypes(include=[np.number]).columns.tolist()
     categorical_features = df_all.select_dtypes(include=["object"]).columns.tolist()
 
     try:
         categorical_encoder = OneHotEncoder(
-            handle_unknown="ignore", sparse_output=False
+            handle_unknown="ignore", sparse_output=sparse
         )
     except TypeError:
-        categorical_encoder = OneHotEncoder(handle_unknown="ignore", sparse=False)
+        categorical_encoder = OneHotEncoder(handle_unknown="ignore", sparse=sparse)
 
     numeric_pipeline = Pipeline(
         steps=[
@@ -457,24 +600,36 @@ def build_preprocessor(df_all: pd.DataFrame) -> ColumnTransformer:
         transformers=[
             ("num", numeric_pipeline, numeric_features),
             ("cat", categorical_pipeline, categorical_features),
-        ]
+        ],
+        # 1.0: con one-hot sparse la salida es CSR siempre, sin importar la densidad
+        sparse_threshold=1.0 if sparse else 0.3,
     )
 
     return preprocessor
 
 
-def make_features(df):
+def make_features(df, stats=None):
     df = add_engineered_features(df)
-    df = fill_domain_na(df)
+    df = fill_domain_na(df, stats=stats)
     df = map_ordinal_categories(df)
     return df
 
 
+def predict_pipelines(pipelines, X, weights=None):
+    """
+    Promedio (o combinación ponderada) de N pipelines sobre X.
+
+    Las predicciones se apilan en una matriz (n, N) y se combinan con un solo
+    producto; weights es un dict nombre -> peso, por defecto pesos iguales.
+    """
+    names = list(pipelines.keys())
+    P = np.column_stack([pipelines[name].predict(X) for name in names])
+    if weights is None:
+        w = np.full(len(names), 1.0 / len(names))
+    else:
+        w = np.array([weights[name] for name in names], dtype=float)
+    return P @ w
+
+
 def predict_5pipeline(pipelines, X):
-    list_keys = list(pipelines.keys())
-    p_lasso = pipelines[list_keys[0]].predict(X)
-    p_rf = pipelines[list_keys[1]].predict(X)
-    p_lgbm = pipelines[list_keys[2]].predict(X)
-    p_xgb = pipelines[list_keys[3]].predict(X)
-    p_cat = pipelines[list_keys[4]].predict(X)
-    return (p_lasso + p_rf + p_lgbm + p_xgb + p_cat) / 5
+    return predict_pipelines(pipelines, X)